@@ -0,0 +1,249 @@
+"""
+Benchmarks for vidtrans: builds a synthetic transcript corpus and synthetic videos in a scratch folder, times
+each stage (SRT loading, indexing, searching, HTML, screenshots, startup), and compares the numbers with a
+stored baseline so that regressions fail loudly.
+
+    python benchmark.py                          # small corpus, compare with the baseline if there is one
+    python benchmark.py --files 1000 --segments 5000
+    python benchmark.py --save-baseline          # record the current numbers as the baseline
+"""
+import argparse
+import builtins
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from unittest import mock
+
+import ffmpeg
+
+import vidtrans
+
+
+baseline_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+search_term = "benchmark"  # planted in the synthetic transcripts so searches have something to find
+vocabulary = ("the", "a", "video", "today", "we", "will", "look", "at", "some", "really", "interesting",
+              "results", "from", "our", "latest", "experiment", "and", "then", "talk", "about", "what",
+              "comes", "next", "for", "project", "team", "data", "model", "search", "frame")
+
+
+# a folder of SRT files in the format save_transcripts writes, with the search term sprinkled through them
+def make_corpus(folder, files, segments, hit_rate):
+    """Write the synthetic SRT files and return how many segments they hold."""
+    rng = random.Random(1234)
+    for number in range(files):
+        with open(os.path.join(folder, f"video{number:05}.srt"), "w", encoding="utf-8") as srt_file:
+            for i in range(segments):
+                words = [rng.choice(vocabulary) for _ in range(rng.randint(6, 14))]
+                if rng.random() < hit_rate:
+                    words[rng.randrange(len(words))] = search_term
+                srt_file.write(f"{i + 1}\n")
+                srt_file.write(f"{vidtrans.format_subtitle_time(i * 3.0)} --> "
+                               f"{vidtrans.format_subtitle_time(i * 3.0 + 2.5)}\n")
+                srt_file.write(f" {' '.join(words)}\n\n")
+    return files * segments
+
+
+# a short test video made locally from ffmpeg's lavfi sources: moving test pattern plus a tone
+def make_video(path, seconds):
+    """Encode a synthetic video of the given length."""
+    video = ffmpeg.input(f"testsrc2=size=1280x720:rate=30:duration={seconds}", f="lavfi")
+    audio = ffmpeg.input(f"sine=frequency=440:duration={seconds}", f="lavfi")
+    (ffmpeg.output(video, audio, path, vcodec="libx264", preset="ultrafast", pix_fmt="yuv420p", acodec="aac")
+     .run(overwrite_output=True, capture_stdout=True, capture_stderr=True))
+
+
+# runs a stage without its progress output, so only the benchmark's own lines are printed
+def quietly(run):
+    """Wrap run so that print is silenced while it executes."""
+    def quiet_run():
+        with mock.patch.object(builtins, "print"):
+            return run()
+    return quiet_run
+
+
+# best-of-N wall time, then one more run under tracemalloc for the peak Python memory
+def measure(name, run, units, unit, setup=None, repeat=3):
+    """Time a stage and return its result record."""
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start_time = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start_time)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    run()
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    seconds = min(timings)
+    record = {
+        'seconds': seconds,
+        'throughput': units / seconds if seconds else float("inf"),
+        'unit': unit,
+        'peak_mb': peak_bytes / 1024 ** 2,
+    }
+    print(f"{name:<22} {seconds * 1000:10.1f} ms {record['throughput']:14.1f} {unit}/s "
+          f"{record['peak_mb']:10.1f} MB peak")
+    return record
+
+
+def run_benchmarks(arguments, folder):
+    """Run every stage against a scratch folder and return {stage: record}."""
+    vidtrans.set_folder(folder)
+    segment_count = make_corpus(folder, arguments.files, arguments.segments, arguments.hit_rate)
+    srt_paths = sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.endswith(".srt"))
+    results = {}
+
+    results['load_subtitles'] = measure(
+        "load_subtitles", lambda: [vidtrans.load_subtitles(path) for path in srt_paths],
+        segment_count, "segments", repeat=arguments.repeat)
+
+    def remove_index():
+        if os.path.exists(os.path.join(folder, vidtrans.index_filename)):
+            os.remove(os.path.join(folder, vidtrans.index_filename))
+
+    results['index_build'] = measure(
+        "index_build", quietly(lambda: vidtrans.update_search_index(folder)),
+        segment_count, "segments", setup=remove_index, repeat=arguments.repeat)
+
+    # searching needs a video next to each transcript; screenshots are timed on their own below,
+    # and the HTML prompt is answered "no"
+    for path in srt_paths:
+        open(f"{os.path.splitext(path)[0]}.mp4", "wb").close()
+    transcripts = {os.path.basename(path): None for path in srt_paths}
+    with mock.patch.object(vidtrans, "capture_screenshots"), mock.patch.object(builtins, "input", return_value="n"):
+        results['search_in_transcripts'] = measure(
+            "search_in_transcripts", quietly(lambda: vidtrans.search_in_transcripts(transcripts, folder, search_term)),
+            len(srt_paths), "files", repeat=arguments.repeat)
+    for path in srt_paths:
+        os.remove(f"{os.path.splitext(path)[0]}.mp4")
+
+    timestamps = [(f"video{i % arguments.files:05}.srt", vidtrans.format_timestamp(i),
+                   f"[Before] 0:00:01: before {i}\n[Match] 0:00:02: the {search_term} {i}\n[After] 0:00:03: after {i}")
+                  for i in range(arguments.results)]
+    with mock.patch.object(vidtrans.webbrowser, "open"):
+        results['generate_html'] = measure(
+            "generate_html", quietly(lambda: vidtrans.generate_html(timestamps, search_term)),
+            len(timestamps), "results", repeat=arguments.repeat)
+
+    if not arguments.skip_video:
+        video_path = os.path.join(folder, "synthetic.mp4")
+        make_video(video_path, arguments.video_seconds)
+        rng = random.Random(99)
+        shots = [(rng.uniform(0, arguments.video_seconds - 1), f"the {search_term} caption number {i}")
+                 for i in range(arguments.frames)]
+
+        # a batch must come back from one ffmpeg run; extract_frames calls itself per frame when it falls back
+        with mock.patch.object(vidtrans, "extract_frames", wraps=vidtrans.extract_frames) as extract_frames:
+            frames = quietly(lambda: vidtrans.extract_frames(video_path, [time for time, _ in shots[:5]]))()
+        if extract_frames.call_count != 1 or None in frames:
+            raise AssertionError(f"extract_frames needed {extract_frames.call_count} ffmpeg runs "
+                                 f"for a batch of {len(frames)} frames")
+
+        def clear_frame_cache():
+            shutil.rmtree(vidtrans.frame_cache_folder, ignore_errors=True)
+
+        results['take_screenshot'] = measure(
+            "take_screenshot", quietly(lambda: vidtrans.take_screenshots(video_path, shots, search_term)),
+            len(shots), "frames", setup=clear_frame_cache, repeat=arguments.repeat)
+        results['take_screenshot_cached'] = measure(
+            "take_screenshot_cached", quietly(lambda: vidtrans.take_screenshots(video_path, shots, search_term)),
+            len(shots), "frames", repeat=arguments.repeat)
+
+    # a whole new process, as a user would start it
+    def start_up():
+        subprocess.run([sys.executable, vidtrans.__file__, "--folder", folder, "--startup-time"],
+                       check=True, capture_output=True)
+
+    results['startup'] = measure("startup", start_up, 1, "starts", repeat=arguments.repeat)
+    return results
+
+
+# anything slower (or hungrier) than the baseline by more than the tolerance is a regression
+def compare_with_baseline(results, baseline, tolerance):
+    """Print how each stage compares with the baseline and return the list of regressions."""
+    regressions = []
+    for stage, record in results.items():
+        previous = baseline.get(stage)
+        if previous is None:
+            continue
+        time_ratio = record['seconds'] / previous['seconds'] if previous['seconds'] else 1.0
+        memory_ratio = record['peak_mb'] / previous['peak_mb'] if previous['peak_mb'] else 1.0
+        print(f"{stage:<22} time x{time_ratio:.2f}, peak memory x{memory_ratio:.2f} against the baseline")
+        if time_ratio > 1 + tolerance:
+            regressions.append(f"{stage} is {(time_ratio - 1) * 100:.0f}% slower")
+        # memory under a megabyte is noise
+        if memory_ratio > 1 + tolerance and record['peak_mb'] > 1:
+            regressions.append(f"{stage} uses {(memory_ratio - 1) * 100:.0f}% more memory")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the stages of vidtrans on synthetic data.")
+    parser.add_argument("--files", type=int, default=20, help="synthetic SRT files (default: %(default)s)")
+    parser.add_argument("--segments", type=int, default=1000, help="segments per file (default: %(default)s)")
+    parser.add_argument("--hit-rate", type=float, default=0.01,
+                        help="share of segments containing the search term (default: %(default)s)")
+    parser.add_argument("--results", type=int, default=2000, help="results in the HTML report (default: %(default)s)")
+    parser.add_argument("--frames", type=int, default=50, help="screenshots to take (default: %(default)s)")
+    parser.add_argument("--video-seconds", type=int, default=60,
+                        help="length of the synthetic video (default: %(default)s)")
+    parser.add_argument("--skip-video", action="store_true", help="leave out the screenshot stages")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage, best is kept (default: %(default)s)")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown against the baseline before failing (default: %(default)s)")
+    parser.add_argument("--baseline", default=baseline_path, help="baseline file (default: %(default)s)")
+    parser.add_argument("--save-baseline", action="store_true", help="store these numbers as the new baseline")
+    arguments = parser.parse_args()
+
+    # baselines are only comparable for the same corpus, so they are kept per configuration
+    configuration = (f"files={arguments.files} segments={arguments.segments} hit_rate={arguments.hit_rate} "
+                     f"results={arguments.results} frames={arguments.frames} video_seconds={arguments.video_seconds}")
+    print(f"Benchmarking with {configuration}")
+
+    folder = tempfile.mkdtemp(prefix="vidtrans_benchmark_")
+    try:
+        results = run_benchmarks(arguments, folder)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    baselines = {}
+    if os.path.exists(arguments.baseline):
+        with open(arguments.baseline, "r", encoding="utf-8") as baseline_file:
+            baselines = json.load(baseline_file)
+
+    if arguments.save_baseline:
+        baselines[configuration] = results
+        with open(arguments.baseline, "w", encoding="utf-8") as baseline_file:
+            json.dump(baselines, baseline_file, indent=2)
+        print(f"Baseline saved to {arguments.baseline}")
+        return 0
+
+    if configuration not in baselines:
+        print("No baseline for this configuration yet; run with --save-baseline to record one.")
+        return 0
+
+    regressions = compare_with_baseline(results, baselines[configuration], arguments.tolerance)
+    if regressions:
+        print("*" * 20)
+        print("PERFORMANCE REGRESSION:")
+        for regression in regressions:
+            print(f"  {regression}")
+        print("*" * 20)
+        return 1
+    print("No regressions against the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,32 @@
+import time
+startup_started = time.perf_counter()  # reported by --startup-time
 import warnings
-warnings.filterwarnings("ignore", category=FutureWarning, module="whisper") # suppress Whisper message
-warnings.filterwarnings("ignore", category=UserWarning,   module="whisper")
-import whisper
 import os
+import sys
+import argparse
 from datetime import timedelta
 import ffmpeg
 import re
+import sqlite3
 from PIL import Image, ImageDraw, ImageFont
 import webbrowser
+import html
+import hashlib
+import json
+import math
+import mmap
+import struct
+import bisect
+from array import array
+import multiprocessing
+import functools
+import contextlib
+import threading
+import queue
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 
 # Explicitly set the path to ffmpeg if it's installed in a specific location
@@ -15,36 +34,445 @@ os.environ["FFMPEG_BINARY"] = "C:\\ffmpeg\\bin\\ffmpeg.exe"  # Update this path
 folder_path = "C:\\videostuff"  # Update this path as needed
 screenshot_folder = os.path.join(folder_path, "screenshots")  # Path for screenshots
 os.makedirs(screenshot_folder, exist_ok=True)
+index_filename = "transcript_index.db"  # on-disk search index, kept next to the transcripts it covers
+screenshot_workers = os.cpu_count() or 4  # videos whose screenshots are extracted at the same time
+screenshot_batch_size = 32  # frames pulled per ffmpeg run; keeps the command line and open inputs bounded
+frame_cache_folder = os.path.join(folder_path, "frame_cache")  # raw frames, reused by later searches
+frame_cache_max_bytes = 2 * 1024 ** 3  # least recently used frames are evicted beyond this size
+screenshot_format = "png"  # or "jpg" for smaller screenshots that are quicker to write
+thumbnail_width = 320  # the HTML report shows thumbnails this wide, each linking to its full screenshot
+thumbnail_format = "jpg"  # or "webp", smaller still where Pillow was built with WebP support
+html_page_size = 200  # results per page of the HTML report
 
 
-# Load Whisper model; Whisper is the transcriber that generates subs for us
-model = whisper.load_model("base") # base is the default; you can use: tiny, base, small, medium, and large
-number_of_results = 0
+# Whisper is the transcriber that generates subs for us; it (and torch) is only loaded once a transcription needs it
+model_name = "base"  # base is the default; you can use: tiny, base, small, medium, and large
+# every size whisper.load_model knows; listed here so a typo is caught without importing whisper
+model_names = ("tiny", "tiny.en", "base", "base.en", "small", "small.en", "medium", "medium.en",
+               "large", "large-v1", "large-v2", "large-v3", "large-v3-turbo", "turbo")
+model = None
+audio_sample_rate = 16000  # what Whisper works at
+transcription_chunk_seconds = 600  # audio transcribed per step; progress is saved after every chunk
+min_parallel_chunk_seconds = 120  # shortest chunk a video is cut into so that several workers can share it
+chunk_overlap_seconds = 1.0  # each chunk also hears this much of the one before; repeated text is dropped
+manifest_folder = os.path.join(folder_path, "transcription_manifest")  # finished and partial transcriptions
+audio_cache_folder = os.path.join(folder_path, "audio_cache")  # decoded 16 kHz mono float32 audio, one file per video
+audio_cache_max_bytes = 20 * 1024 ** 3  # about 85 hours of audio; least recently used files are evicted beyond this
+audio_decode_workers = 2  # videos decoded ahead of the transcription workers
+use_vad = False  # only send the stretches of audio with sound in them to Whisper (see detect_speech)
+vad_frame_ms = 30  # loudness is measured over frames of this length
+vad_threshold_db = 12.0  # frames this much louder than the quietest tenth of the audio count as sound
+vad_min_db = -55.0  # ...and never anything quieter than this (dBFS), so near-silent files are not all "speech"
+vad_padding_seconds = 0.3  # kept around every stretch of sound so word edges are not clipped
+vad_min_silence_seconds = 1.0  # shorter pauses are kept, as Whisper needs them to hear sentence breaks
+watch_poll_seconds = 5.0  # how often --watch looks at the folder
+watch_settle_seconds = 15.0  # a video must keep the same size and mtime this long before it counts as copied
+watch_queue_size = 4  # videos --watch keeps waiting for transcription; any more are picked up when there is room
+serve_address = "127.0.0.1:8765"  # where --serve listens by default; a path (with a "/") is a Unix socket instead
+serve_search_threads = 4  # searches the service runs at the same time
+serve_index_refresh_seconds = 10.0  # the service looks for new or changed transcripts at most this often
+fuzzy_max_distance = 2  # most typos a fuzzy search word may have (fewer for short words)
+startup_budget_seconds = 1.0  # --startup-time fails if getting to the menu takes longer than this
+transcription_workers = max(1, (os.cpu_count() or 1) // 4)  # videos transcribed at once, each in its own process
+threads_per_worker = max(1, (os.cpu_count() or 1) // transcription_workers)  # torch threads per worker process
+video_hashes = {}  # (path, size, mtime) -> content hash, so each video is only hashed once per session
+video_hashes_lock = threading.Lock()
+metrics_folder = os.path.join(folder_path, "metrics")  # timing spans (metrics.jsonl) and their totals (metrics.prom)
+metric_totals = {}  # stage -> {'runs': ..., 'seconds': ..., unit: amount}, written out as metrics.prom
+# span fields that measure work done and so are added up; anything else (a chunk number, a name) is only logged
+metric_units = ("audio_seconds", "speech_seconds", "segments", "transcripts", "removed", "videos", "results",
+                "queries", "matches", "pages", "frames", "screenshots", "cached_frames")
+metrics_lock = threading.Lock()
+open_spans = 0  # metrics.prom is rewritten whenever the last open span ends
+metrics_log_file = None  # metrics.jsonl, kept open (line-buffered) while the metrics folder stays the same
+show_progress_bar = True  # Whisper's own progress bar (never in worker processes, where the bars would collide)
 
 
 # Creates subtitles for a specific video
 def transcribe_video(video_path):
-    """Transcribe the audio of a video file with progress estimation."""
+    """Transcribe the audio of a video file chunk by chunk, resuming an interrupted run from its manifest."""
+    manifest = load_manifest(video_path)
+    if manifest and manifest['status'] == "done":
+        print(f"Already transcribed with the '{model_name}' model: {video_path}")
+        return manifest['result']
+
     print(f"Starting transcription for: {video_path}")
     print("Note that this process takes a long time...")
-    result = model.transcribe(video_path, word_timestamps=True)
-    
-    '''
-    segments = result['segments']
+    audio = load_audio(video_path)
+    manifest = prepare_manifest(video_path, manifest, audio, transcription_chunk_seconds)
+    pending = pending_chunks(manifest)
+    if len(pending) < len(manifest['plan']):
+        print(f"Resuming after {len(manifest['plan']) - len(pending)} finished chunk(s)...")
 
-    num_of_segments = len(result['segments'])
-    
+    # every finished chunk is written to the manifest, so a crash or Ctrl-C only loses the chunk in progress
+    for number in pending:
+        start_sample, end_sample = manifest['plan'][number]
+        manifest['chunks'].append(transcribe_chunk(audio, number, start_sample, end_sample))
+        save_manifest(video_path, manifest)
+        print(f"Progress: chunk {number + 1}/{len(manifest['plan'])} - Current timestamp: "
+              f"{timedelta(seconds=round(end_sample / audio_sample_rate))}")
+
+    return finish_transcription(video_path, manifest)
+
+
+# start (or pick up) the manifest of a video, including how its audio is cut into chunks
+def prepare_manifest(video_path, manifest, audio, chunk_seconds):
+    """Return the manifest for a transcription in progress, creating it and its chunk plan if needed."""
+    if manifest is None:
+        manifest = {
+            'video': os.path.basename(video_path),
+            'hash': video_content_hash(video_path),
+            'model': model_name,
+            'chunk_seconds': chunk_seconds,
+            'status': "partial",
+            'plan': plan_chunks(audio, chunk_seconds),
+            'chunks': [],
+        }
+    elif 'plan' not in manifest:
+        # written before chunk plans were stored: fixed-length chunks, numbered in order
+        step = manifest['chunk_seconds'] * audio_sample_rate
+        manifest['plan'] = [[start, min(start + step, len(audio))] for start in range(0, max(len(audio), 1), step)]
+        for number, chunk in enumerate(manifest['chunks']):
+            chunk.setdefault('number', number)
+    return manifest
+
+
+def pending_chunks(manifest):
+    """Return the numbers of the chunks in the plan that have not been transcribed yet."""
+    finished = {chunk['number'] for chunk in manifest['chunks']}
+    return [number for number in range(len(manifest['plan'])) if number not in finished]
+
+
+# cut the audio into chunks of about chunk_seconds, at the quietest moment near each cut so no word is split
+def plan_chunks(audio, chunk_seconds):
+    """Return [start sample, end sample] pairs covering the audio, with the cuts placed at low-energy points."""
+    import numpy as np
+
+    target = int(chunk_seconds * audio_sample_rate)
+    search = min(target // 10, 30 * audio_sample_rate)  # how far either side of the ideal cut to look
+    frame_samples = audio_sample_rate * vad_frame_ms // 1000
+
+    cuts = [0]
+    while len(audio) - cuts[-1] > target + search:
+        low = cuts[-1] + target - search
+        energy = frame_energy_db(audio[low:cuts[-1] + target + search], frame_samples)
+        cuts.append(low + int(np.argmin(energy)) * frame_samples + frame_samples // 2)
+    cuts.append(len(audio))
+    return [[start, end] for start, end in zip(cuts, cuts[1:])]
+
+
+# transcribe one planned chunk; it starts a little early so words at the cut are heard in full
+def transcribe_chunk(audio, number, start_sample, end_sample):
+    """Transcribe one chunk of a video's audio and return its manifest record, in video time."""
+    window_start = max(0, start_sample - int(chunk_overlap_seconds * audio_sample_rate)) if number else start_sample
+    start_time = time.perf_counter()
+    with span("transcribe_chunk", chunk=number) as fields:
+        result, speech_samples = transcribe_audio(audio[window_start:end_sample])
+        fields['audio_seconds'] = (end_sample - window_start) / audio_sample_rate
+        fields['speech_seconds'] = speech_samples / audio_sample_rate
+    offset = window_start / audio_sample_rate
+    return {
+        'number': number,
+        'start': start_sample / audio_sample_rate,
+        'language': result.get('language'),
+        'segments': [shift_segment(segment, offset) for segment in result['segments']],
+        'audio_seconds': fields['audio_seconds'],
+        'speech_seconds': fields['speech_seconds'],
+        'transcribe_seconds': time.perf_counter() - start_time,
+    }
+
+
+# put the chunks back together into one transcript and mark the video as done
+def finish_transcription(video_path, manifest):
+    """Stitch the finished chunks of a manifest into a Whisper-style result, save it as done and return it."""
+    chunks = sorted(manifest['chunks'], key=lambda chunk: chunk['number'])
+    segments = []
+    for chunk in chunks:
+        boundary = chunk['start'] + chunk_overlap_seconds
+        for segment in chunk['segments']:
+            # around the cut, the overlap means the previous chunk may already have this text
+            if segments and segment['start'] < boundary:
+                previous = segments[-1]
+                if segment['end'] <= previous['end'] + 0.05:
+                    continue
+                if segment.get('words'):
+                    # the words heard before the previous segment ended are already in it; keep only the rest
+                    words = [word for word in segment['words'] if word['start'] >= previous['end']]
+                    if not words:
+                        continue
+                    if len(words) < len(segment['words']):
+                        segment = {**segment, 'start': words[0]['start'], 'words': words,
+                                   'text': "".join(word['word'] for word in words)}
+                        segment.pop('tokens', None)  # Whisper's token ids no longer match the text
+                elif segment['start'] < previous['end'] and tokenize(segment['text']) == tokenize(previous['text']):
+                    continue
+            segments.append(segment)
     for i, segment in enumerate(segments):
-        progress = (i / num_of_segments) * 100
-        print(f"Progress: {progress:.2f}% - Current timestamp: {timedelta(seconds=segment['end'])}")
-    '''
+        segment['id'] = i
+
+    result = {
+        'text': "".join(segment['text'] for segment in segments),
+        'segments': segments,
+        'language': next((chunk['language'] for chunk in chunks if chunk['language']), None),
+    }
+
+    audio_seconds = sum(chunk.get('audio_seconds', 0) for chunk in chunks)
+    speech_seconds = sum(chunk.get('speech_seconds', chunk.get('audio_seconds', 0)) for chunk in chunks)
+    if speech_seconds < audio_seconds:
+        print(f"Voice activity detection skipped {timedelta(seconds=round(audio_seconds - speech_seconds))} "
+              f"of {timedelta(seconds=round(audio_seconds))} "
+              f"({(audio_seconds - speech_seconds) / audio_seconds * 100:.0f}% of the audio), "
+              f"about {audio_seconds / max(speech_seconds, 1):.1f}x less audio for Whisper to get through.")
+
+    # the finished result replaces the per-chunk partials
+    manifest['status'] = "done"
+    manifest['result'] = result
+    del manifest['chunks']
+    save_manifest(video_path, manifest)
     print(f"Completed transcription for: {video_path}")
     return result
 
 
+# run Whisper over a stretch of audio, optionally over just the parts that have sound in them
+def transcribe_audio(audio):
+    """Transcribe audio with word timestamps; returns (result in the audio's own time, samples sent to Whisper)."""
+    import numpy as np
+
+    spans = detect_speech(audio) if use_vad else [(0, len(audio))]
+    speech_samples = sum(end - start for start, end in spans)
+    if not spans:
+        return {'text': "", 'segments': [], 'language': None}, 0
+    if speech_samples >= len(audio) * 0.95:
+        # barely anything to skip; not worth stitching
+        return get_model().transcribe(audio, word_timestamps=True, verbose=whisper_verbosity()), len(audio)
+
+    result = get_model().transcribe(np.concatenate([audio[start:end] for start, end in spans]),
+                                    word_timestamps=True, verbose=whisper_verbosity())
+
+    # map times in the concatenated speech back onto the original timeline
+    span_starts = []
+    position = 0
+    for start, end in spans:
+        span_starts.append(position)
+        position += end - start
+
+    def to_original(seconds, is_end):
+        sample = seconds * audio_sample_rate
+        # an end time that falls exactly on a joint belongs to the span before it, a start time to the one after
+        span = (bisect.bisect_left(span_starts, sample) if is_end else bisect.bisect_right(span_starts, sample)) - 1
+        span = max(span, 0)
+        return (spans[span][0] + sample - span_starts[span]) / audio_sample_rate
+
+    for segment in result['segments']:
+        segment['start'], segment['end'] = to_original(segment['start'], False), to_original(segment['end'], True)
+        for word in segment.get('words', []):
+            word['start'], word['end'] = to_original(word['start'], False), to_original(word['end'], True)
+    return result, speech_samples
+
+
+# Whisper prints nothing for None and just a progress bar for False
+def whisper_verbosity():
+    """Return the verbose setting for Whisper's transcribe."""
+    return False if show_progress_bar and multiprocessing.parent_process() is None else None
+
+
+# energy-based voice activity detection: cheap, CPU only, and errs on the side of keeping audio
+# (music and noisy b-roll are kept; silence and near-silence are what gets skipped)
+def detect_speech(audio):
+    """Return the (start sample, end sample) spans of the audio that have sound worth transcribing."""
+    import numpy as np
+
+    frame_samples = audio_sample_rate * vad_frame_ms // 1000
+    frame_count = len(audio) // frame_samples
+    if frame_count == 0:
+        return [(0, len(audio))] if len(audio) else []
+
+    energy = frame_energy_db(audio, frame_samples)
+    threshold = max(np.percentile(energy, 10) + vad_threshold_db, vad_min_db)
+    voiced = energy > threshold
+
+    # widen every loud frame by the padding, then close up pauses shorter than the minimum silence
+    padding = int(vad_padding_seconds * 1000 / vad_frame_ms)
+    if padding:
+        voiced = np.convolve(voiced.astype(np.int8), np.ones(2 * padding + 1, dtype=np.int8), mode="same") > 0
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], voiced.astype(np.int8), [0]))))
+    min_silence_frames = int(vad_min_silence_seconds * 1000 / vad_frame_ms)
+
+    spans = []
+    for start, end in zip(edges[::2], edges[1::2]):
+        if spans and start - spans[-1][1] < min_silence_frames:
+            spans[-1][1] = end
+        else:
+            spans.append([start, end])
+
+    # frame numbers to samples; the leftover samples after the last whole frame go with a span that reaches it
+    return [(int(start) * frame_samples, len(audio) if end == frame_count else int(end) * frame_samples)
+            for start, end in spans]
+
+
+# loudness of each short frame of the audio
+def frame_energy_db(audio, frame_samples):
+    """Return the RMS level in dBFS of each whole frame of the audio."""
+    import numpy as np
+
+    frame_count = len(audio) // frame_samples
+    frames = np.asarray(audio[:frame_count * frame_samples], dtype=np.float32).reshape(frame_count, frame_samples)
+    return 10 * np.log10(np.mean(np.square(frames), axis=1) + 1e-10)
+
+
+# move a chunk's segment (and its words) from chunk time to video time
+def shift_segment(segment, offset):
+    """Return the parts of a Whisper segment we keep, with its times moved on by offset seconds."""
+    return {
+        'start': segment['start'] + offset,
+        'end': segment['end'] + offset,
+        'text': segment['text'],
+        'words': [{'word': word['word'], 'start': word['start'] + offset, 'end': word['end'] + offset,
+                   'probability': word.get('probability')}
+                  for word in segment.get('words', [])],
+    }
+
+
+# the decoded soundtrack of a video, mapped straight from the audio cache
+def load_audio(video_path):
+    """Return the audio of a video as 16 kHz mono float32 samples, memory-mapped from the audio cache."""
+    import numpy as np
+
+    pcm_path = extract_audio(video_path)
+    if os.path.getsize(pcm_path) == 0:
+        return np.zeros(0, dtype=np.float32)
+    # copy-on-write, so Whisper gets a writable array without ever touching the cache file
+    return np.memmap(pcm_path, dtype=np.float32, mode="c")
+
+
+# decode a video's soundtrack the way Whisper wants it, once per video contents
+def extract_audio(video_path):
+    """Decode a video's audio to a raw 16 kHz mono float32 file in the audio cache and return its path."""
+    pcm_path = os.path.join(audio_cache_folder, f"{video_content_hash(video_path)}.f32")
+    if os.path.exists(pcm_path):
+        os.utime(pcm_path)
+        return pcm_path
+
+    os.makedirs(audio_cache_folder, exist_ok=True)
+    partial_path = f"{pcm_path}.{os.getpid()}.partial"
+    with span("decode_audio", video=os.path.basename(video_path)) as fields:
+        try:
+            (ffmpeg.input(video_path)
+             .output(partial_path, format="f32le", acodec="pcm_f32le", ac=1, ar=audio_sample_rate)
+             .run(overwrite_output=True, capture_stdout=True, capture_stderr=True))
+        except ffmpeg.Error:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
+        fields['audio_seconds'] = os.path.getsize(partial_path) / 4 / audio_sample_rate
+    os.replace(partial_path, pcm_path)
+    return pcm_path
+
+
+# audio decoding runs ahead on its own threads, so the model is never left waiting on ffmpeg. Only a few videos
+# are decoded ahead, so the audio cache holds what is about to be transcribed rather than the whole folder.
+def decode_ahead(video_paths):
+    """Yield the videos in order, each once its audio is in the cache, while the next ones are being decoded."""
+    def decode(video_path):
+        manifest = load_manifest(video_path)
+        if manifest and manifest['status'] == "done":
+            return  # nothing left to transcribe, so nothing to decode
+        extract_audio(video_path)
+
+    decoder = ThreadPoolExecutor(max_workers=audio_decode_workers)
+    try:
+        remaining = iter(video_paths)
+        futures = deque((video_path, decoder.submit(decode, video_path))
+                        for video_path in itertools.islice(remaining, audio_decode_workers + 1))
+        while futures:
+            video_path, future = futures.popleft()
+            for next_path in itertools.islice(remaining, 1):
+                futures.append((next_path, decoder.submit(decode, next_path)))
+            try:
+                future.result()
+            except ffmpeg.Error as e:
+                error_message = e.stderr.decode() if e.stderr else "No error message provided by ffmpeg."
+                print(f"Could not decode the audio of {video_path}, skipping it:", error_message)
+                continue
+            except OSError as e:
+                # e.g. deleted or renamed since it was listed (or queued by --watch)
+                print(f"Could not read {video_path}, skipping it: {e}")
+                continue
+            # keep the cache in bounds during long runs too; the least recently used audio goes first
+            prune_cache(audio_cache_folder, audio_cache_max_bytes)
+            yield video_path
+    finally:
+        # don't sit through decoding videos that will no longer be transcribed (e.g. after Ctrl-C)
+        decoder.shutdown(wait=False, cancel_futures=True)
+
+
+# one manifest file per (video contents, model) pair, so worker processes never write to the same file
+def manifest_path(video_path):
+    """Return where the transcription manifest for a video and the current model lives."""
+    return os.path.join(manifest_folder, f"{video_content_hash(video_path)}_{model_name}.json")
+
+
+def load_manifest(video_path):
+    """Return the manifest for a video and the current model, or None if it has none yet."""
+    try:
+        with open(manifest_path(video_path), "r", encoding="utf-8") as manifest_file:
+            return json.load(manifest_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+# written to a side file and then swapped in, so a crash mid-write never leaves a broken manifest
+def save_manifest(video_path, manifest):
+    """Atomically write the manifest for a video and the current model."""
+    os.makedirs(manifest_folder, exist_ok=True)
+    path = manifest_path(video_path)
+    with open(f"{path}.partial", "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file)
+    os.replace(f"{path}.partial", path)
+
+
+# point the program at another video folder; the screenshots and caches live inside it
+def set_folder(path):
+    """Use path as the video folder, moving the screenshot, cache and manifest folders along with it."""
+    global folder_path, screenshot_folder, frame_cache_folder, manifest_folder, audio_cache_folder, metrics_folder
+    folder_path = path
+    screenshot_folder = os.path.join(folder_path, "screenshots")
+    os.makedirs(screenshot_folder, exist_ok=True)
+    frame_cache_folder = os.path.join(folder_path, "frame_cache")
+    manifest_folder = os.path.join(folder_path, "transcription_manifest")
+    audio_cache_folder = os.path.join(folder_path, "audio_cache")
+    metrics_folder = os.path.join(folder_path, "metrics")
+
+
+# load the Whisper model the first time a transcription needs it
+def get_model():
+    """Return the Whisper model, importing whisper/torch and loading the weights on first use."""
+    global model
+    if model is None:
+        warnings.filterwarnings("ignore", category=FutureWarning, module="whisper") # suppress Whisper message
+        warnings.filterwarnings("ignore", category=UserWarning,   module="whisper")
+        import whisper
+
+        print(f"Loading Whisper model '{model_name}'...")
+        model = whisper.load_model(model_name)
+    return model
+
+
+# switch model size; the new one is loaded lazily like the first
+def set_model(name):
+    """Choose the Whisper model size used by later transcriptions."""
+    global model, model_name
+    if name not in model_names:
+        raise ValueError(f"Unknown Whisper model '{name}'; choose one of: {', '.join(model_names)}")
+    if name != model_name:
+        model_name = name
+        model = None
+
+
 # save the resulting transcript in different file formats
 def save_transcripts(transcript, video_path):
     """Save transcript in TXT, SRT, and VTT formats."""
+    save_started = time.perf_counter()
     base_filename = os.path.splitext(video_path)[0]
 
     # Save as TXT (useful for simply reading the subs using a text editor)
@@ -54,78 +482,900 @@ def save_transcripts(transcript, video_path):
     # Save as SRT (the program will use this one)
     with open(f"{base_filename}.srt", "w") as srt_file:
         for i, segment in enumerate(transcript['segments']):
-            start_time = timedelta(seconds=segment['start'])
-            end_time = timedelta(seconds=segment['end'])
+            start_time = format_subtitle_time(segment['start'])
+            end_time = format_subtitle_time(segment['end'])
             srt_file.write(f"{i + 1}\n")
-            srt_file.write(f"{str(start_time)[:-3]} --> {str(end_time)[:-3]}\n")
+            srt_file.write(f"{start_time} --> {end_time}\n")
             srt_file.write(f"{segment['text']}\n\n")
     
     # Save as VTT (the option was readily available, so no harm in including it)
     with open(f"{base_filename}.vtt", "w") as vtt_file:
         vtt_file.write("WEBVTT\n\n")
         for segment in transcript['segments']:
-            start_time = timedelta(seconds=segment['start'])
-            end_time = timedelta(seconds=segment['end'])
-            vtt_file.write(f"{str(start_time)[:-3].replace('.', ',')} --> {str(end_time)[:-3].replace('.', ',')}\n")
+            start_time = format_subtitle_time(segment['start'])
+            end_time = format_subtitle_time(segment['end'])
+            vtt_file.write(f"{start_time.replace('.', ',')} --> {end_time.replace('.', ',')}\n")
             vtt_file.write(f"{segment['text']}\n\n")
 
+    # Save the word timings Whisper gave us (used for word-exact search hits and screenshots)
+    save_word_timings(transcript, f"{base_filename}.words")
 
-# parse the srt file and group lines together as needed 
-def parse_srt_file(srt_path):
-    """Parse an SRT file and return a list of segments with start times and text."""
-    segments = []
-    with open(srt_path, "r", encoding="utf-8") as srt_file:
-        srt_content = srt_file.read()
+    # Keep the search index in step with the SRT we just (re)wrote
+    index_transcript(f"{base_filename}.srt")
+    record_span("save_transcripts", time.perf_counter() - save_started,
+                video=os.path.basename(video_path), segments=len(transcript['segments']))
 
-    # combine multiple lines as an individual subtitle group
-    pattern = re.compile(
-        r"(\d+)\n(\d+:\d+:\d+\.\d+) --> (\d+:\d+:\d+\.\d+)\n(.+?)(?=\n\n|\Z)",
-        re.DOTALL
-    )
-    
-    matches = pattern.findall(srt_content)
-
-    for match in matches:
-        index, start_time, end_time, text = match
-        start_time_obj = convert_to_timedelta(start_time)
-        end_time_obj = convert_to_timedelta(end_time)
-        text = " ".join(line.strip() for line in text.splitlines())
-        segments.append({'start': start_time_obj, 'end': end_time_obj, 'text': text})
-
-    return segments
-
-
-# get a usable timedelta
-def convert_to_timedelta(timestamp):
-    """Convert timestamp of format H:MM:SS.mmm to timedelta."""
-    hours, minutes, seconds_milliseconds = timestamp.split(":")
-    seconds, milliseconds = seconds_milliseconds.split(".")
-    return timedelta(
-        hours=int(hours),
-        minutes=int(minutes),
-        seconds=int(seconds)
+
+# H:MM:SS.mmm for subtitle files; str(timedelta)[:-3] cut whole seconds short ("0:00:05" became "0:00")
+def format_subtitle_time(seconds):
+    """Format seconds as H:MM:SS.mmm."""
+    total_ms = round(seconds * 1000)
+    hours, remainder = divmod(total_ms, 3600000)
+    minutes, remainder = divmod(remainder, 60000)
+    seconds, milliseconds = divmod(remainder, 1000)
+    return f"{hours}:{minutes:02}:{seconds:02}.{milliseconds:03}"
+
+
+# subtitles held as columns rather than a dict and two timedeltas per segment: millisecond start and end times
+# in int32 arrays, and all the texts in one string with a table of where each starts
+class Subtitles:
+    """The segments of a subtitle file; len() of them, subtitles[i] gives (start ms, end ms, text)."""
+
+    def __init__(self, starts, ends, text, offsets):
+        self.starts = starts
+        self.ends = ends
+        self.text = text
+        self.offsets = offsets  # segment i's text is text[offsets[i]:offsets[i + 1]]
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, i):
+        return self.starts[i], self.ends[i], self.text[self.offsets[i]:self.offsets[i + 1]]
+
+    def texts(self):
+        """Yield the text of every segment in order."""
+        offsets = self.offsets
+        for i in range(len(self.starts)):
+            yield self.text[offsets[i]:offsets[i + 1]]
+
+
+# read an SRT or VTT file a line at a time: a cue is its timing line ("start --> end") and the text lines up to the
+# next blank line. Cue numbers, the WEBVTT header and NOTE blocks are not inside a cue, so they are skipped.
+def load_subtitles(path):
+    """Load the segments of an SRT or VTT file as Subtitles."""
+    starts = array('i')
+    ends = array('i')
+    offsets = array('i', [0])
+    texts = []
+    cue_lines = None
+    length = 0
+
+    with open(path, "r", encoding="utf-8-sig") as subtitle_file:
+        for line in subtitle_file:
+            if "-->" in line:
+                start, _, rest = line.partition("-->")
+                starts.append(subtitle_time_ms(start))
+                ends.append(subtitle_time_ms(rest.split(None, 1)[0]))  # VTT may put cue settings after the time
+                cue_lines = []
+            elif cue_lines is not None:
+                line = line.strip()
+                if line:
+                    cue_lines.append(line)
+                else:
+                    text = " ".join(cue_lines)
+                    texts.append(text)
+                    length += len(text)
+                    offsets.append(length)
+                    cue_lines = None
+    if cue_lines is not None:
+        text = " ".join(cue_lines)
+        texts.append(text)
+        offsets.append(length + len(text))
+
+    return Subtitles(starts, ends, "".join(texts), offsets)
+
+
+# subtitle times as written by save_transcripts (0:01:02.500 in SRTs, 0:01:02,500 in VTTs) or by anything else
+# (00:01:02,500 or 01:02.500). SRTs written before format_subtitle_time lost the seconds of whole-second times
+# ("0:01:02" came out as "0:01"); those are read as hours and minutes, the best that is left of them.
+def subtitle_time_ms(timestamp):
+    """Return a subtitle timestamp in milliseconds."""
+    timestamp = timestamp.strip()
+    if timestamp[-4:-3] in (".", ",") and timestamp[-7:-6] == ":" and timestamp[-10:-9] == ":":
+        # H:MM:SS.mmm, by far the most common, sliced straight out
+        return (((int(timestamp[:-10]) * 60 + int(timestamp[-9:-7])) * 60 + int(timestamp[-6:-4])) * 1000
+                + int(timestamp[-3:]))
+    clock, _, fraction = timestamp.replace(",", ".").partition(".")
+    parts = clock.split(":")
+    if len(parts) == 3:
+        hours, minutes, seconds = parts
+    elif fraction:
+        hours, minutes, seconds = 0, parts[0], parts[1]
+    else:
+        hours, minutes, seconds = parts[0], parts[1], 0
+    return ((int(hours) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + int((fraction + "00")[:3])
+
+
+# split text into the lowercase word tokens the search index is keyed on
+def tokenize(text):
+    """Return the normalized word tokens of a piece of text."""
+    return re.findall(r"\w+", text.lower())
+
+
+# open (and create if needed) the search index that lives in a transcript folder
+def open_search_index(folder_path):
+    """Open the on-disk inverted index for a folder, creating its tables on first use."""
+    connection = sqlite3.connect(os.path.join(folder_path, index_filename), timeout=30)
+    connection.executescript("""
+        CREATE TABLE IF NOT EXISTS files (
+            id INTEGER PRIMARY KEY,
+            name TEXT UNIQUE NOT NULL,
+            mtime REAL NOT NULL,
+            size INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS segments (
+            file_id INTEGER NOT NULL,
+            seg INTEGER NOT NULL,
+            start_ms INTEGER NOT NULL,
+            end_ms INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            PRIMARY KEY (file_id, seg)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS postings (
+            token TEXT NOT NULL,
+            file_id INTEGER NOT NULL,
+            seg INTEGER NOT NULL,
+            PRIMARY KEY (token, file_id, seg)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS vocabulary (
+            token TEXT PRIMARY KEY,
+            phonetic TEXT NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS vocabulary_phonetic ON vocabulary (phonetic);
+        CREATE TABLE IF NOT EXISTS trigrams (
+            gram TEXT NOT NULL,
+            token TEXT NOT NULL,
+            PRIMARY KEY (gram, token)
+        ) WITHOUT ROWID;
+    """)
+    # version 1 keeps segment times to the millisecond; older indexes had them cut to whole seconds, so every
+    # transcript is marked as changed and re-indexed on the next update
+    version = connection.execute("PRAGMA user_version").fetchone()[0]
+    if version < 1:
+        with connection:
+            connection.execute("UPDATE files SET mtime = -1")
+    # version 2 changed how phonetic_key treats the first letter, so the stored keys are worked out again
+    if version < 2:
+        with connection:
+            tokens = [token for token, in connection.execute("SELECT token FROM vocabulary")]
+            connection.executemany("UPDATE vocabulary SET phonetic = ? WHERE token = ?",
+                                   ((phonetic_key(token), token) for token in tokens))
+        connection.execute("PRAGMA user_version = 2")
+    return connection
+
+
+# add or refresh one SRT in the index; unchanged files (same mtime and size) are skipped
+def index_transcript(srt_path, connection=None):
+    """Index the segments of an SRT file, re-indexing only if it changed since the last run."""
+    own_connection = connection is None
+    if own_connection:
+        connection = open_search_index(os.path.dirname(srt_path) or ".")
+
+    try:
+        name = os.path.basename(srt_path)
+        stat = os.stat(srt_path)
+        row = connection.execute("SELECT id, mtime, size FROM files WHERE name = ?", (name,)).fetchone()
+        if row and row[1] == stat.st_mtime and row[2] == stat.st_size:
+            return False
+
+        subtitles = load_subtitles(srt_path)
+        with connection:
+            if row:
+                file_id = row[0]
+                connection.execute("DELETE FROM postings WHERE file_id = ?", (file_id,))
+                connection.execute("DELETE FROM segments WHERE file_id = ?", (file_id,))
+                connection.execute("UPDATE files SET mtime = ?, size = ? WHERE id = ?",
+                                   (stat.st_mtime, stat.st_size, file_id))
+            else:
+                file_id = connection.execute("INSERT INTO files (name, mtime, size) VALUES (?, ?, ?)",
+                                             (name, stat.st_mtime, stat.st_size)).lastrowid
+
+            connection.executemany(
+                "INSERT INTO segments (file_id, seg, start_ms, end_ms, text) VALUES (?, ?, ?, ?, ?)",
+                zip(itertools.repeat(file_id), itertools.count(), subtitles.starts, subtitles.ends, subtitles.texts())
+            )
+            tokens = [set(tokenize(text)) for text in subtitles.texts()]
+            connection.executemany(
+                "INSERT INTO postings (token, file_id, seg) VALUES (?, ?, ?)",
+                ((token, file_id, i) for i, segment_tokens in enumerate(tokens) for token in segment_tokens)
+            )
+            add_to_vocabulary(connection, set().union(*tokens))
+        return True
+    finally:
+        if own_connection:
+            connection.close()
+
+
+# bring the whole folder's index up to date; only new or modified SRTs get parsed
+def update_search_index(folder_path):
+    """Incrementally update the search index for every SRT in a folder and drop deleted ones."""
+    start_time = time.perf_counter()
+    connection = open_search_index(folder_path)
+    try:
+        srt_names = {f for f in os.listdir(folder_path) if f.endswith(".srt")}
+        updated = sum(index_transcript(os.path.join(folder_path, name), connection) for name in sorted(srt_names))
+
+        # indexes made before fuzzy search existed have postings but no vocabulary yet
+        if not connection.execute("SELECT 1 FROM vocabulary LIMIT 1").fetchone():
+            with connection:
+                add_to_vocabulary(connection, {
+                    token for token, in connection.execute("SELECT DISTINCT token FROM postings")})
+
+        stale = [(file_id,) for file_id, name in connection.execute("SELECT id, name FROM files")
+                 if name not in srt_names]
+        if stale:
+            with connection:
+                connection.executemany("DELETE FROM postings WHERE file_id = ?", stale)
+                connection.executemany("DELETE FROM segments WHERE file_id = ?", stale)
+                connection.executemany("DELETE FROM files WHERE id = ?", stale)
+        if updated or stale:
+            print(f"Search index updated: {updated} transcript(s) indexed, {len(stale)} removed.")
+    finally:
+        connection.close()
+    record_span("index_update", time.perf_counter() - start_time, transcripts=updated, removed=len(stale))
+
+
+# look up the segments that contain every word of the search term
+def query_search_index(connection, search_term):
+    """Return {srt name: [segment numbers]} for segments containing all tokens of the term."""
+    tokens = sorted(set(tokenize(search_term)))
+    if tokens:
+        query = " INTERSECT ".join(["SELECT file_id, seg FROM postings WHERE token = ?"] * len(tokens))
+        rows = connection.execute(
+            f"SELECT files.name, hits.seg FROM ({query}) AS hits "
+            f"JOIN files ON files.id = hits.file_id ORDER BY files.name, hits.seg",
+            tokens
+        )
+    else:
+        # nothing word-like to look up (e.g. only punctuation), so every segment is a candidate
+        rows = connection.execute(
+            "SELECT files.name, segments.seg FROM segments "
+            "JOIN files ON files.id = segments.file_id ORDER BY files.name, segments.seg"
+        )
+
+    candidates = {}
+    for name, seg in rows:
+        candidates.setdefault(name, []).append(seg)
+    return candidates
+
+
+# record the distinct words of the corpus with their trigrams and sound-alike key, for fuzzy search
+def add_to_vocabulary(connection, tokens):
+    """Add any tokens the vocabulary does not have yet, along with their trigrams and phonetic keys."""
+    tokens = list(tokens)
+    known = set()
+    for start in range(0, len(tokens), 500):
+        batch = tokens[start:start + 500]
+        known.update(token for token, in connection.execute(
+            f"SELECT token FROM vocabulary WHERE token IN ({', '.join('?' * len(batch))})", batch))
+    new_tokens = [token for token in tokens if token not in known]
+
+    connection.executemany("INSERT INTO vocabulary (token, phonetic) VALUES (?, ?)",
+                           ((token, phonetic_key(token)) for token in new_tokens))
+    connection.executemany("INSERT OR IGNORE INTO trigrams (gram, token) VALUES (?, ?)",
+                           ((gram, token) for token in new_tokens for gram in trigrams(token)))
+
+
+# the overlapping three-letter pieces of a word, padded so the start and end of the word count too
+def trigrams(token):
+    """Return the set of character trigrams of a token."""
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# American Soundex: words that sound alike ("Catherine", "Kathryn") get the same key. Plain Soundex keeps
+# the first letter as it is written, which would keep those two apart (C365, K365), so first letters that
+# sound the same are folded together first: a hard c or q is a k, and a silent first letter is dropped
+def phonetic_key(token):
+    """Return the Soundex code of a token (digits and other non-letters are kept as they are)."""
+    letters = [c for c in token.lower() if "a" <= c <= "z"]
+    if not letters:
+        return token
+    if "".join(letters[:2]) in ("kn", "gn", "pn", "ps", "wr"):
+        letters = letters[1:]
+    elif "".join(letters[:2]) == "ph":
+        letters = ["f"] + letters[2:]
+    elif letters[0] in "cq" and (len(letters) == 1 or letters[1] not in "eiy"):
+        letters = ["k"] + letters[1:]
+    codes = {c: str(digit) for digit, group in enumerate(
+        ("aeiouy", "bfpv", "cgjkqsxz", "dt", "l", "mn", "r")) for c in group}
+    key = letters[0].upper()
+    previous = codes.get(letters[0], "")
+    for c in letters[1:]:
+        code = codes.get(c, "")
+        if code and code != "0" and code != previous:
+            key += code
+        if c not in "hw":  # h and w don't separate letters with the same code
+            previous = code
+    return (key + "000")[:4]
+
+
+# Levenshtein distance from one word to many candidates at once: the dynamic programming table is filled
+# row by row for all candidates together, so the Python-level loop only runs over the characters
+def edit_distances(word, candidates):
+    """Return a numpy array with the edit distance from word to each candidate."""
+    import numpy as np
+
+    lengths = np.array([len(candidate) for candidate in candidates])
+    width = int(lengths.max(initial=0))
+    codes = np.full((len(candidates), width), -1, dtype=np.int32)
+    for row, candidate in enumerate(candidates):
+        codes[row, :len(candidate)] = [ord(c) for c in candidate]
+
+    previous = np.tile(np.arange(width + 1, dtype=np.int32), (len(candidates), 1))
+    for i, c in enumerate(word, 1):
+        current = np.empty_like(previous)
+        current[:, 0] = i
+        current[:, 1:] = np.minimum(previous[:, 1:] + 1, previous[:, :-1] + (codes != ord(c)))
+        for j in range(1, width + 1):
+            np.minimum(current[:, j], current[:, j - 1] + 1, out=current[:, j])
+        previous = current
+    return previous[np.arange(len(candidates)), lengths]
+
+
+# vocabulary words within a few typos of a search word, found through shared trigrams (and optionally sound)
+def similar_tokens(connection, word, use_phonetic=True):
+    """Return {token: edit distance} for the indexed tokens that are spelled (or sound) like word."""
+    # allow more typos in longer words: none up to 2 letters, 1 up to 4, then up to fuzzy_max_distance
+    max_distance = min(fuzzy_max_distance, max(0, (len(word) - 1) // 2))
+    grams = sorted(trigrams(word))
+    # every edit breaks at most three trigrams, so a close enough word must still share the rest
+    min_shared = max(1, len(grams) - 3 * max_distance)
+    candidates = {token for token, in connection.execute(
+        f"SELECT token FROM trigrams WHERE gram IN ({', '.join('?' * len(grams))}) "
+        f"AND length(token) BETWEEN ? AND ? GROUP BY token HAVING COUNT(*) >= ?",
+        (*grams, len(word) - max_distance, len(word) + max_distance, min_shared)
+    )}
+    sound_alikes = set()
+    if use_phonetic:
+        sound_alikes = {token for token, in connection.execute(
+            "SELECT token FROM vocabulary WHERE phonetic = ?", (phonetic_key(word),))}
+    candidates = sorted(candidates | sound_alikes)
+    if not candidates:
+        return {}
+
+    return {token: int(distance) for token, distance in zip(candidates, edit_distances(word, candidates))
+            if distance <= max_distance or token in sound_alikes}
+
+
+# approximate search: every word of the query may be misspelled (or, optionally, just sound the same)
+def fuzzy_search(folder_path, search_term, use_phonetic=True, limit=100):
+    """Return up to limit segments matching every word of the term approximately, closest matches first."""
+    update_search_index(folder_path)
+    connection = open_search_index(folder_path)
+    try:
+        scores = None
+        for word in tokenize(search_term):
+            # the closest variant of this word in each segment that has one
+            best = {}
+            for token, distance in sorted(similar_tokens(connection, word, use_phonetic).items(),
+                                          key=lambda item: item[1], reverse=True):
+                for file_id, seg in connection.execute(
+                        "SELECT file_id, seg FROM postings WHERE token = ?", (token,)):
+                    best[(file_id, seg)] = (distance, token)
+            if scores is None:
+                scores = {key: ([distance], [token]) for key, (distance, token) in best.items()}
+            else:
+                scores = {key: (distances + [best[key][0]], tokens + [best[key][1]])
+                          for key, (distances, tokens) in scores.items() if key in best}
+            if not scores:
+                return []
+        if not scores:
+            return []
+
+        names = dict(connection.execute("SELECT id, name FROM files"))
+        ranked = sorted(scores.items(), key=lambda item: (sum(item[1][0]), names[item[0][0]], item[0][1]))[:limit]
+        results = []
+        for (file_id, seg), (distances, tokens) in ranked:
+            segments = fetch_indexed_segments(connection, names[file_id], seg - 1, seg + 1)
+            results.append({
+                'srt': names[file_id],
+                'seg': seg,
+                'segments': segments,
+                'distance': sum(distances),
+                'matched': tokens,
+            })
+        return results
+    finally:
+        connection.close()
+
+
+# fetch a handful of neighbouring segments for one transcript straight from the index
+def fetch_indexed_segments(connection, srt_name, first_seg, last_seg):
+    """Return {segment number: segment dict} for the given range of an indexed transcript."""
+    rows = connection.execute(
+        "SELECT segments.seg, segments.start_ms, segments.end_ms, segments.text FROM segments "
+        "JOIN files ON files.id = segments.file_id "
+        "WHERE files.name = ? AND segments.seg BETWEEN ? AND ?",
+        (srt_name, first_seg, last_seg)
     )
+    return {
+        seg: {'start': timedelta(milliseconds=start_ms), 'end': timedelta(milliseconds=end_ms), 'text': text}
+        for seg, start_ms, end_ms, text in rows
+    }
+
+
+# word timings sidecar (.words): a 12-byte header (magic, version, word count) followed by little-endian
+# int32 start ms, int32 end ms, int32 segment number, uint32 text offsets (count + 1) and the UTF-8 words
+word_timings_magic = b"VSLW"
+word_timings_header = struct.Struct("<4sII")
+
+
+# write the per-word timings of a Whisper transcript as parallel arrays
+def save_word_timings(transcript, words_path):
+    """Save the word start/end times, segment numbers and text of a transcript to a binary sidecar."""
+    starts, ends, segment_numbers, offsets = array("i"), array("i"), array("i"), array("I", [0])
+    text = bytearray()
+    for i, segment in enumerate(transcript['segments']):
+        for word in segment.get('words', []):
+            starts.append(round(word['start'] * 1000))
+            ends.append(round(word['end'] * 1000))
+            segment_numbers.append(i)
+            text += word['word'].strip().encode("utf-8")
+            offsets.append(len(text))
+
+    if not starts:
+        # nothing to save (e.g. an older transcript without word timestamps); don't leave a stale sidecar behind
+        if os.path.exists(words_path):
+            os.remove(words_path)
+        return
+
+    # written aside and swapped in, so a search never maps a half-written file
+    with open(f"{words_path}.partial", "wb") as words_file:
+        words_file.write(word_timings_header.pack(word_timings_magic, 1, len(starts)))
+        for column in (starts, ends, segment_numbers, offsets):
+            if sys.byteorder == "big":
+                column.byteswap()
+            words_file.write(column.tobytes())
+        words_file.write(text)
+    os.replace(f"{words_path}.partial", words_path)
+
+
+# memory-mapped view of a .words sidecar; the arrays are read in place, nothing is parsed
+class WordTimings:
+    """Word start/end times (ms), segment numbers and text of one transcript, backed by mmap."""
+
+    def __init__(self, words_path):
+        with open(words_path, "rb") as words_file:
+            self.mmap = mmap.mmap(words_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = word_timings_header.unpack_from(self.mmap)
+        if magic != word_timings_magic or version != 1 or sys.byteorder == "big":
+            self.mmap.close()
+            raise ValueError(f"{words_path} is not a word timings file this version can read.")
+        position = word_timings_header.size
+        if len(self.mmap) < position + 16 * count + 4:
+            self.mmap.close()
+            raise ValueError(f"{words_path} is shorter than its {count} words need; it was not written in full.")
+
+        self.count = count
+        view = memoryview(self.mmap)
+        self.starts = view[position:position + 4 * count].cast("i")
+        self.ends = view[position + 4 * count:position + 8 * count].cast("i")
+        self.segments = view[position + 8 * count:position + 12 * count].cast("i")
+        self.offsets = view[position + 12 * count:position + 16 * count + 4].cast("I")
+        self.text = view[position + 16 * count + 4:]
+        self.views = [view, self.starts, self.ends, self.segments, self.offsets, self.text]
+
+    def word(self, i):
+        """Return the text of word i."""
+        return bytes(self.text[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+    def segment_words(self, segment_number):
+        """Return the range of word numbers belonging to a segment."""
+        first = bisect.bisect_left(self.segments, segment_number)
+        return range(first, bisect.bisect_left(self.segments, segment_number + 1, first))
+
+    def find_phrase(self, segment_number, search_tokens):
+        """Return (first word, last word) for each occurrence of the tokens that starts in the segment."""
+        words = self.segment_words(segment_number)
+        # the tokens of this segment's words, followed by just enough words to finish a match running past its end
+        tokens = []
+        for i in words:
+            tokens.extend((token, i) for token in tokenize(self.word(i)))
+        next_word = words.stop
+        match_starts = len(tokens)
+        while next_word < self.count and len(tokens) < match_starts + len(search_tokens) - 1:
+            tokens.extend((token, next_word) for token in tokenize(self.word(next_word)))
+            next_word += 1
+
+        found = []
+        for start in range(match_starts):
+            window = tokens[start:start + len(search_tokens)]
+            if len(window) == len(search_tokens) and all(t == s for (t, _), s in zip(window, search_tokens)):
+                found.append((window[0][1], window[-1][1]))
+        return found
+
+    def close(self):
+        """Release the views and unmap the file."""
+        for view in reversed(self.views):
+            view.release()
+        self.mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# load a transcript's word timings if it has them
+def load_word_timings(words_path):
+    """Return the WordTimings for a sidecar, or None if there is none (or it cannot be read)."""
+    if not os.path.exists(words_path):
+        return None
+    try:
+        return WordTimings(words_path)
+    except (ValueError, struct.error):
+        print(f"Ignoring unreadable word timings in {words_path}.")
+        return None
 
 
 # transcribe all videos in the folder
 def transcribe_videos_in_folder(folder_path):
     """Transcribe all videos in a folder and save transcripts to text, SRT, and VTT files."""
+    video_paths = [os.path.join(folder_path, filename) for filename in os.listdir(folder_path)
+                   if filename.endswith(('.mp4', '.mkv', '.avi', '.mov'))]
+    return transcribe_videos(video_paths)
+
+
+# transcribe only what has not been done yet: unfinished (or never started) videos for the current model
+def transcribe_remaining_videos(folder_path):
+    """Transcribe the videos in a folder that the manifest does not list as done for this model."""
+    remaining = [os.path.join(folder_path, filename) for filename in os.listdir(folder_path)
+                 if filename.endswith(('.mp4', '.mkv', '.avi', '.mov'))
+                 and needs_transcription(os.path.join(folder_path, filename))]
+    if not remaining:
+        print("All videos are already transcribed.")
+        return {}
+    return transcribe_videos(remaining)
+
+
+def needs_transcription(video_path):
+    """Return whether a video still needs transcripts for the current model written next to it."""
+    # a finished manifest without an SRT is a copy of a video done before; it only needs its files written
+    srt_path = f"{os.path.splitext(video_path)[0]}.srt"
+    manifest = load_manifest(video_path)
+    if manifest and manifest['status'] == "done":
+        return not os.path.exists(srt_path)
+
+    # transcripts made before there was a manifest count as done, unless the video changed since
+    return not (manifest is None and os.path.exists(srt_path) and not has_any_manifest(video_path)
+                and os.path.getmtime(srt_path) >= os.path.getmtime(video_path))
+
+
+def finished_manifest(video_path):
+    """Return the done manifest of a video if its SRT is newer than the video, else None."""
+    srt_path = f"{os.path.splitext(video_path)[0]}.srt"
+    try:
+        if not os.path.exists(srt_path) or os.path.getmtime(srt_path) < os.path.getmtime(video_path):
+            return None
+        manifest = load_manifest(video_path)
+    except OSError:
+        return None  # the video is gone; transcribe_videos reports it
+    return manifest if manifest and manifest['status'] == "done" else None
+
+
+def has_any_manifest(video_path):
+    """Return whether these video contents have a manifest for any model."""
+    prefix = f"{video_content_hash(video_path)}_"
+    return os.path.isdir(manifest_folder) and any(
+        name.startswith(prefix) and name.endswith(".json") for name in os.listdir(manifest_folder))
+
+
+# watch mode: videos copied into the folder are transcribed, and their transcripts indexed, as they arrive.
+# Only the new video is indexed (save_transcripts does that), so nothing is rescanned in full.
+def watch_folder(folder_path):
+    """Transcribe new and changed videos as they land in the folder, until interrupted."""
+    work = queue.Queue(maxsize=watch_queue_size)
+    threading.Thread(target=watch_for_videos, args=(folder_path, work), daemon=True).start()
+    print(f"Watching {folder_path} for new or changed videos (Ctrl-C to stop)...")
+    # one pool for the whole session, so each worker loads the model once rather than once per batch
+    pool = start_transcription_pool() if transcription_workers > 1 else None
+    try:
+        while True:
+            # a blocked get() would not notice Ctrl-C (at all, on Windows), so it wakes up now and then
+            try:
+                batch = [work.get(timeout=watch_poll_seconds)]
+            except queue.Empty:
+                continue
+            # whatever else is waiting goes into the same run, up to one video per worker
+            while len(batch) < transcription_workers:
+                try:
+                    batch.append(work.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                transcribe_videos(batch, pool)
+            except BrokenProcessPool:
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = start_transcription_pool()
+            except Exception as e:
+                # one bad batch must not end the session; its videos are queued again if they change
+                print(f"Transcribing {', '.join(os.path.basename(video_path) for video_path in batch)} failed: {e}")
+            print(f"Watching {folder_path} for new or changed videos (Ctrl-C to stop)...")
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+# polls rather than using OS file events, which are unreliable on network shares and say nothing about
+# whether a copy has finished: a video is only queued once its size and mtime have held for a while
+def watch_for_videos(folder_path, work):
+    """Queue each new or changed video that needs transcribing once it has finished copying (runs on a thread)."""
+    settling = {}  # video path -> ((size, mtime), when it was first seen like that)
+    handled = {}  # video path -> (size, mtime) it had when it was last queued or found to be done
+    while True:
+        current = {}
+        with os.scandir(folder_path) as entries:
+            for entry in entries:
+                if entry.name.endswith(('.mp4', '.mkv', '.avi', '.mov')) and entry.is_file():
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue  # deleted since the folder was listed
+                    if stat.st_size:
+                        current[entry.path] = (stat.st_size, stat.st_mtime)
+
+        now = time.monotonic()
+        for video_path, signature in sorted(current.items()):
+            if handled.get(video_path) == signature:
+                continue
+            if video_path not in settling or settling[video_path][0] != signature:
+                settling[video_path] = (signature, now)
+                continue
+            if now - settling[video_path][1] < watch_settle_seconds:
+                continue
+            # back-pressure: with the queue full, the rest wait for a later poll
+            if work.full():
+                break
+            del settling[video_path]
+            handled[video_path] = signature
+            try:
+                queue_it = needs_transcription(video_path)
+            except OSError as e:
+                print(f"Could not read {video_path}: {e}")
+                continue
+            if queue_it:
+                print(f"Queued {os.path.basename(video_path)} for transcription.")
+                work.put(video_path)
+
+        # forget videos that were deleted (or renamed) in the meantime
+        for tracked in (settling, handled):
+            for video_path in set(tracked) - set(current):
+                del tracked[video_path]
+        time.sleep(watch_poll_seconds)
+
+
+# run several transcriptions side by side, longest videos first so no worker is left with a long tail
+def transcribe_videos(video_paths, pool=None):
+    """Transcribe videos on a pool of worker processes and save their transcripts; returns {filename: result}.
+
+    A pool passed in (see start_transcription_pool) is left running for the caller to use again."""
+    # finished videos whose transcripts are already written are neither probed nor saved (and so re-indexed) again
     transcripts = {}
-    
-    for filename in os.listdir(folder_path):
-        if filename.endswith(('.mp4', '.mkv', '.avi', '.mov')):
-            video_path = os.path.join(folder_path, filename)
-            print("Video Path:", video_path)
-            print(f"Transcribing {filename}...")
+    remaining = []
+    for video_path in video_paths:
+        manifest = finished_manifest(video_path)
+        if manifest:
+            transcripts[os.path.basename(video_path)] = manifest['result']
+        else:
+            remaining.append(video_path)
+    if transcripts:
+        print(f"{len(transcripts)} video(s) already transcribed with the '{model_name}' model.")
+    already_done = len(transcripts)
+    video_paths = remaining
+    if not video_paths:
+        return transcripts
 
-            result = transcribe_video(video_path)
-            transcripts[filename] = result
+    durations = {video_path: video_duration(video_path) for video_path in video_paths}
+    ordered = sorted(video_paths, key=durations.get, reverse=True)
+    workers = transcription_workers
+    print(f"Transcribing {len(ordered)} video(s) ({sum(durations.values()) / 3600:.2f} hours of audio) "
+          f"with {workers} worker(s), {threads_per_worker} thread(s) each...")
+
+    start_time = time.perf_counter()
+    audio_seconds_done = 0.0
+    own_pool = workers > 1 and pool is None
+    if workers == 1:
+        init_transcription_worker(model_name, threads_per_worker, use_vad, folder_path)
+        finished = map(transcribe_worker, decode_ahead(ordered))
+    else:
+        if own_pool:
+            pool = start_transcription_pool()
+        # videos are split into chunks as their audio becomes ready, and the chunks shared out among the workers
+        finished = transcribe_in_pool(pool, workers, decode_ahead(ordered))
+
+    try:
+        for video_path, result in finished:
+            filename = os.path.basename(video_path)
             save_transcripts(result, video_path)
-            print(f"Transcripts saved for {filename}")
+            transcripts[filename] = result
+
+            audio_seconds_done += durations[video_path]
+            elapsed = time.perf_counter() - start_time
+            print(f"Transcripts saved for {filename} ({len(transcripts) - already_done}/{len(ordered)} done, "
+                  f"{audio_seconds_done / elapsed:.2f} audio-seconds per wall-second so far)")
+    except BrokenProcessPool:
+        # a worker died (e.g. killed for running out of memory); the chunks finished so far are in the manifests
+        print("A transcription worker stopped unexpectedly; the videos under way are resumed by the next run.")
+        if not own_pool:
+            raise  # the caller's pool is no use any more
+    finally:
+        if own_pool:
+            pool.shutdown(wait=False, cancel_futures=True)
 
+    elapsed = time.perf_counter() - start_time
+    record_span("transcription", elapsed, videos=len(transcripts) - already_done, audio_seconds=audio_seconds_done)
+    print(f"Transcribed {audio_seconds_done / 3600:.2f} hours of audio in {elapsed / 60:.1f} minutes: "
+          f"{audio_seconds_done / elapsed:.2f} audio-seconds per wall-second.")
     return transcripts
 
 
+# the worker processes for transcribe_videos; the models they load stay loaded for as long as the pool runs
+def start_transcription_pool():
+    """Return a process pool of transcription_workers workers set up for the current model and folder."""
+    # spawn rather than fork: torch's thread pools do not survive a fork
+    return ProcessPoolExecutor(
+        max_workers=transcription_workers, mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_transcription_worker, initargs=(model_name, threads_per_worker, use_vad, folder_path)
+    )
+
+
+# set up a transcription worker. The model itself is loaded by the first chunk the worker gets (and kept for the
+# rest), so a model that cannot be loaded fails that chunk instead of the process start, which the pool would retry
+def init_transcription_worker(name, threads, vad, folder):
+    """Choose the Whisper model for this process and limit the torch threads it uses."""
+    global use_vad
+    use_vad = vad
+    if folder != folder_path:
+        set_folder(folder)
+    set_model(name)
+    import torch
+    torch.set_num_threads(threads)
+
+
+def transcribe_worker(video_path):
+    """Transcribe one video inside a worker and hand the result back to the scheduler."""
+    print(f"Transcribing {os.path.basename(video_path)}...")
+    return video_path, transcribe_video(video_path)
+
+
+def transcribe_chunk_worker(video_path, number, start_sample, end_sample):
+    """Transcribe one chunk of a video inside a worker; the audio comes straight from the audio cache."""
+    try:
+        return video_path, transcribe_chunk(load_audio(video_path), number, start_sample, end_sample)
+    except ffmpeg.Error as e:
+        # ffmpeg.Error cannot be unpickled, which would break the pool for every other chunk
+        error_message = e.stderr.decode() if e.stderr else "No error message provided by ffmpeg."
+        raise RuntimeError(f"ffmpeg error: {error_message}") from None
+
+
+# chunk-level scheduling: even a single long video keeps every worker busy. The manifests are only ever
+# touched here, in the parent, as the workers hand back their chunks.
+def transcribe_in_pool(pool, workers, video_paths):
+    """Yield (video path, result) as videos finish, transcribing their chunks in parallel on the pool."""
+    events = queue.Queue()
+    # a video is only taken from decode_ahead once there is room for it, so decoding stays a few videos ahead
+    # of the workers instead of draining the whole folder into the audio cache
+    slots = threading.Semaphore(audio_decode_workers + 1)
+
+    def feed():
+        try:
+            video_paths_left = iter(video_paths)
+            while True:
+                slots.acquire()
+                video_path = next(video_paths_left, None)
+                if video_path is None:
+                    break
+                events.put(("decoded", video_path, None))
+        finally:
+            events.put(("fed", None, None))
+
+    threading.Thread(target=feed, daemon=True).start()
+    open_manifests = {}
+    fed = False
+    start_time = time.perf_counter()
+    audio_seconds_done = 0.0
+    while not fed or open_manifests:
+        event, video_path, payload = events.get()
+        if event == "fed":
+            fed = True
+
+        elif event == "decoded":
+            manifest = load_manifest(video_path)
+            if manifest and manifest['status'] == "done":
+                print(f"Already transcribed with the '{model_name}' model: {video_path}")
+                slots.release()
+                yield video_path, manifest['result']
+                continue
+
+            # short enough chunks that the workers can share a video, but no shorter than is worthwhile
+            audio = load_audio(video_path)
+            duration = len(audio) / audio_sample_rate
+            chunk_seconds = min(transcription_chunk_seconds, max(min_parallel_chunk_seconds, duration / workers))
+            manifest = prepare_manifest(video_path, manifest, audio, chunk_seconds)
+            del audio
+            pending = pending_chunks(manifest)
+            print(f"Transcribing {os.path.basename(video_path)} in {len(pending)} chunk(s)...")
+            if not pending:
+                slots.release()
+                yield video_path, finish_transcription(video_path, manifest)
+                continue
+
+            open_manifests[video_path] = manifest
+            for number in pending:
+                future = pool.submit(transcribe_chunk_worker, video_path, number, *manifest['plan'][number])
+                future.add_done_callback(functools.partial(report_chunk, events, video_path))
+
+        elif event == "chunk" and video_path in open_manifests:
+            manifest = open_manifests[video_path]
+            manifest['chunks'].append(payload)
+            save_manifest(video_path, manifest)
+            # the worker logged this chunk's span itself; its totals are only kept here
+            count_span("transcribe_chunk", payload['transcribe_seconds'],
+                       audio_seconds=payload['audio_seconds'], speech_seconds=payload['speech_seconds'])
+
+            # how far this video has got, and how long the videos under way should take at the rate so far
+            start_sample, end_sample = manifest['plan'][payload['number']]
+            audio_seconds_done += (end_sample - start_sample) / audio_sample_rate
+            finished = {chunk['number'] for chunk in manifest['chunks']}
+            video_done = sum(end - start for number, (start, end) in enumerate(manifest['plan']) if number in finished)
+            remaining = sum(end - start for other in open_manifests.values()
+                            for number, (start, end) in enumerate(other['plan'])
+                            if number not in {chunk['number'] for chunk in other['chunks']}) / audio_sample_rate
+            rate = audio_seconds_done / (time.perf_counter() - start_time)
+            print(f"Progress: {os.path.basename(video_path)} chunk {payload['number'] + 1}/{len(manifest['plan'])}, "
+                  f"{len(manifest['chunks'])} finished ({video_done / max(manifest['plan'][-1][1], 1) * 100:.0f}% "
+                  f"of its audio); about {timedelta(seconds=round(remaining / rate))} left for the videos under way")
+            if not pending_chunks(manifest):
+                del open_manifests[video_path]
+                slots.release()
+                yield video_path, finish_transcription(video_path, manifest)
+
+        elif event == "failed" and isinstance(payload, BrokenProcessPool):
+            raise payload
+
+        elif event == "failed" and video_path in open_manifests:
+            # the chunks finished so far stay in the manifest for the next run
+            print(f"Transcription of {video_path} failed: {payload}")
+            del open_manifests[video_path]
+            slots.release()
+
+
+# runs on the pool's own thread as each chunk comes back; the scheduler above picks the event up
+def report_chunk(events, video_path, future):
+    """Queue a finished chunk, or the reason it failed, for transcribe_in_pool."""
+    if future.cancelled():
+        return
+    if future.exception() is not None:
+        events.put(("failed", video_path, future.exception()))
+    else:
+        events.put(("chunk", *future.result()))
+
+
+# length of a video in seconds according to ffprobe (0 if it cannot be read)
+def video_duration(video_path):
+    """Return the duration of a video in seconds."""
+    try:
+        return float(ffmpeg.probe(video_path)["format"]["duration"])
+    except (ffmpeg.Error, KeyError, ValueError):
+        print(f"Could not read the duration of {video_path}.")
+        return 0.0
+
+
 # find all instances that match your search phrase and make screenshots with the captions
 def search_in_transcripts(transcripts, folder_path, search_term):
     """
@@ -134,64 +1384,29 @@ def search_in_transcripts(transcripts, folder_path, search_term):
     """
     results = {}
     all_timestamps = []  # Collect timestamps and matched text for HTML
-    global number_of_results
+    screenshot_jobs = {}  # video path -> [(time, overlay text)], extracted together once the search is done
     number_of_results = 0
-    number_of_this_video = 0
 
-    # find the word in question; coded to ignore results where the word is inside another word (for example,
-    # if looking for "here", it will NOT return results for "tHEREfore".  However, it will find instances of
-    # "here!" and "here." and so on. Open to change based on users' requests.
-    search_pattern = re.compile(rf"\b{re.escape(search_term)}\b[.,!?]*", re.IGNORECASE)
-    
-    for video_name in transcripts.keys():
-        print(f"Searching in {video_name}...")
-        matches = []
-
-        base_name = os.path.splitext(video_name)[0]
-        video_path = None
-        for ext in ['.mp4', '.mkv', '.avi', '.mov']:
-            potential_video_path = os.path.join(folder_path, base_name + ext)
-            if os.path.exists(potential_video_path):
-                video_path = potential_video_path
-                break
-        
-        if video_path is None:
-            print(f"No video file found for {video_name}. Skipping screenshot capture.")
-            continue
-
-        srt_path = os.path.join(folder_path, f"{base_name}.srt")
-        if os.path.exists(srt_path):
-            segments = parse_srt_file(srt_path)
-            for i, segment in enumerate(segments):
-                if search_pattern.search(segment['text']):
-                    # Gather context: previous and next segments if they exist
-                    prev_segment = segments[i - 1] if i > 0 else None
-                    next_segment = segments[i + 1] if i < len(segments) - 1 else None
-
-                    # Format the context
-                    context_text = ""
-                    if prev_segment:
-                        context_text += f"[Before] {str(prev_segment['start'])}: {prev_segment['text']}\n"
-                    context_text += f"[Match] {str(segment['start'])}: {segment['text']}\n"
-                    if next_segment:
-                        context_text += f"[After] {str(next_segment['start'])}: {next_segment['text']}"
-
-                    # Format timestamp using format_timestamp function
-                    timestamp_str = format_timestamp(segment['start'].total_seconds())
-
-                    # Append the formatted context to the HTML output list
-                    all_timestamps.append((video_name, timestamp_str, context_text))
-
-                    # Take screenshot with formatted timestamp
-                    matches.append((segment['start'], context_text))
-                    take_screenshot(video_path, segment['start'].total_seconds(), segment['text'], search_term)
-                    number_of_results += 1
-                    number_of_this_video += 1
-        if matches:
-            results[video_name] = matches
-        print("Results in this video: ", number_of_this_video)
-        number_of_this_video = 0
-        
+    with span("search", term=search_term) as search_fields:
+        for video_name, video_path, matches in find_matches(folder_path, search_term, transcripts.keys()):
+            print(f"Searching in {video_name}...")
+            if video_path is None:
+                print(f"No video file found for {video_name}. Skipping screenshot capture.")
+                continue
+            for match in matches:
+                # Append the formatted context to the HTML output list
+                all_timestamps.append((video_name, match['timestamp'], match['context']))
+
+                # Queue the screenshot; all of this video's frames are pulled in one go below
+                screenshot_jobs.setdefault(video_path, []).append((match['time'].total_seconds(), match['overlay']))
+            if matches:
+                results[video_name] = [(match['time'], match['context']) for match in matches]
+            number_of_results += len(matches)
+            print("Results in this video: ", len(matches))
+        search_fields['results'] = number_of_results
+
+    capture_screenshots(screenshot_jobs, search_term)
+
     print("*" * 20)
     print("Found", number_of_results, "total result(s).")
     print("*" * 20, "\n")
@@ -200,214 +1415,808 @@ def search_in_transcripts(transcripts, folder_path, search_term):
         user_choice = input("Do you want to create and view some HTML with the data? [Will be saved in Screenshots] (y/n): ")
         if user_choice.lower() == 'y':
             generate_html(all_timestamps, search_term)
-    number_of_results = 0
     return results
 
 
-
-def generate_html(timestamps, search_term):
-    """Generate an HTML file in the screenshots folder, with context and screenshot toggles."""
-    html_path = os.path.join(screenshot_folder, "search_results.html")
-    html_content = f"""
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Search Results</title>
-        <style>
-            body {{
-                font-family: Arial, sans-serif;
-                color: #333;
-                background-color: #f4f4f4;
-                line-height: 1.6;
-            }}
-            h1 {{
-                color: #00509E;
-                border-bottom: 2px solid #ddd;
-                padding-bottom: 10px;
-                margin-bottom: 20px;
-            }}
-            .result {{
-                background-color: #ffffff;
-                border: 1px solid #ddd;
-                border-radius: 5px;
-                padding: 15px;
-                margin-bottom: 15px;
-                box-shadow: 1px 1px 5px rgba(0, 0, 0, 0.1);
-            }}
-            .context-before, .context-after {{
-                display: inline;  /* Show context by default */
-                color: #555;
-            }}
-            .screenshot {{
-                display: inline; /* Ensure screenshots are visible on load */
-                margin-top: 10px;
-                max-width: 100%;
-                border-radius: 5px;
-                border: 1px solid #ddd;
-            }}
-            .toggle-button, .global-toggle-button {{
-                color: #00509E;
-                cursor: pointer;
-                text-decoration: underline;
-                font-size: 0.9em;
-                margin-right: 15px;
-            }}
-            .toggle-button:hover, .global-toggle-button:hover {{
-                text-decoration: none;
-                background-color: #e0f1ff;
-                padding: 3px;
-                border-radius: 3px;
-            }}
-            .highlight {{
-                background-color: yellow;
-                font-weight: bold;
-            }}
-            .timestamp {{
-                font-weight: bold;
-                color: #00509E;
-                margin-top: 5px;
-            }}
-        </style>
-        <script>
-            function toggleContext() {{
-                var contextsBefore = document.querySelectorAll('.context-before');
-                var contextsAfter = document.querySelectorAll('.context-after');
-                var isCurrentlyShown = contextsBefore[0].style.display === "inline";
-                contextsBefore.forEach(context => {{
-                    context.style.display = isCurrentlyShown ? "none" : "inline";
-                }});
-                contextsAfter.forEach(context => {{
-                    context.style.display = isCurrentlyShown ? "none" : "inline";
-                }});
-            }}
-
-            function toggleAllScreenshots() {{
-                var screenshots = document.querySelectorAll('.screenshot');
-                var isCurrentlyShown = screenshots[0].style.display === "inline";
-                screenshots.forEach(screenshot => {{
-                    screenshot.style.display = isCurrentlyShown ? "none" : "inline";
-                }});
-            }}
-
-            window.onload = function() {{
-                var contextsBefore = document.querySelectorAll('.context-before');
-                var contextsAfter = document.querySelectorAll('.context-after');
-                contextsBefore.forEach(context => context.style.display = "inline");
-                contextsAfter.forEach(context => context.style.display = "inline");
-
-                var screenshots = document.querySelectorAll('.screenshot');
-                screenshots.forEach(screenshot => screenshot.style.display = "inline");
-            }};
-        </script>
-    </head>
-    <body>
-        <h1>Search Results</h1>
-        <button class="global-toggle-button" onclick="toggleContext()">Show/Hide All Context</button>
-        <button class="global-toggle-button" onclick="toggleAllScreenshots()">Show/Hide All Screenshots</button>
-        <ul>
+# the search itself, without any printing or prompting, so the menu and the search service can share it
+def find_matches(folder_path, search_term, srt_names=None, connection=None):
+    """
+    Yield (transcript name, video path or None, matches) for each transcript (all indexed ones by default).
+    Each match is a dict with the 'time' (timedelta), 'timestamp', 'context' and screenshot 'overlay' text.
+    Without a connection the index is brought up to date and opened for the search.
     """
+    # find the word in question; coded to ignore results where the word is inside another word (for example,
+    # if looking for "here", it will NOT return results for "tHEREfore".  However, it will find instances of
+    # "here!" and "here." and so on. Open to change based on users' requests.
+    search_pattern = re.compile(rf"\b{re.escape(search_term)}\b[.,!?]*", re.IGNORECASE)
 
-    for index, (video_name, timestamp, context_text) in enumerate(timestamps):
-        time_parts = timestamp.split('.')
-        timestamp = time_parts[0]
-        screenshot_filename = f"{os.path.splitext(video_name)[0]}_screenshot_{timestamp.replace(':', '-')}.png"
-        
-        # Highlight the match term in the match text
-        highlighted_context_text = context_text.replace(
-            search_term,
-            f"<span class='highlight'>{search_term}</span>"
+    # the index narrows the search down to segments containing every word of the term;
+    # the regex above then confirms each candidate
+    own_connection = connection is None
+    if own_connection:
+        update_search_index(folder_path)
+        connection = open_search_index(folder_path)
+    try:
+        if srt_names is None:
+            srt_names = [name for name, in connection.execute("SELECT name FROM files ORDER BY name")]
+        candidates = query_search_index(connection, search_term)
+        search_tokens = tokenize(search_term)
+        phrase_candidates = query_search_index(connection, search_tokens[0]) if len(search_tokens) > 1 else {}
+
+        for video_name in list(srt_names):
+            video_started = time.perf_counter()
+            base_name = os.path.splitext(video_name)[0]
+            video_path = find_video(folder_path, base_name)
+            if video_path is None:
+                yield video_name, None, []
+                continue
+
+            srt_name = f"{base_name}.srt"
+            hit_segments = candidates.get(srt_name, [])
+            words = load_word_timings(os.path.join(folder_path, f"{base_name}.words"))
+            if words and len(search_tokens) > 1:
+                # with word timings a phrase can also run on into the next segment; those start with its first word
+                hit_segments = sorted(set(hit_segments) | set(phrase_candidates.get(srt_name, [])))
+
+            matches = []
+            for i in hit_segments:
+                # only the candidate segment and its neighbours are read from the index
+                segments = fetch_indexed_segments(connection, srt_name, i - 1, i + 1)
+                segment = segments[i]
+                phrase_matches = words.find_phrase(i, search_tokens) if words and search_tokens else []
+                segment_match = search_pattern.search(segment['text'])
+                if segment_match or phrase_matches:
+                    next_segment = segments.get(i + 1)
+
+                    # the first matching word's own start time where we have word timings, the segment start otherwise
+                    if phrase_matches:
+                        match_time = timedelta(milliseconds=words.starts[phrase_matches[0][0]])
+                    else:
+                        match_time = segment['start']
+                    overlay_text = segment['text']
+                    if not segment_match and next_segment:
+                        overlay_text = f"{segment['text']} {next_segment['text']}"
+
+                    matches.append({
+                        'time': match_time,
+                        'timestamp': format_timestamp(match_time.total_seconds()),
+                        'context': format_context(segments, i),
+                        'overlay': overlay_text,
+                    })
+            if words:
+                words.close()
+            record_span("search_video", time.perf_counter() - video_started, video=video_name, results=len(matches))
+            yield video_name, video_path, matches
+    finally:
+        if own_connection:
+            connection.close()
+
+
+# batch search: a file of terms, phrases and AND/OR/NOT combinations, all answered by one pass over the corpus
+def batch_search(folder_path, terms_path, output_folder=None):
+    """Match every query in a terms file against all transcripts at once and write one results file per query."""
+    output_folder = output_folder or os.path.join(folder_path, "batch_results")
+    leaves = {}  # phrase (tuple of tokens) -> leaf number
+    queries = []  # (query text, parsed expression)
+    with open(terms_path, "r", encoding="utf-8") as terms_file:
+        for line_number, line in enumerate(terms_file, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                # parsed against a copy, so a rejected line adds no phrases to the automaton
+                line_leaves = dict(leaves)
+                expression = parse_batch_query(line, line_leaves)
+                # only segments containing one of a query's phrases are looked at, so a query that holds
+                # without any of them (NOT draft, a OR NOT b) would silently miss most of its matches
+                if evaluate_batch_query(expression, set()):
+                    raise ValueError(f"{line!r} would match segments without any of its terms; "
+                                     f"it needs at least one term that is not under NOT")
+            except ValueError as e:
+                print(f"Skipping line {line_number} of {terms_path}: {e}")
+                continue
+            leaves.update(line_leaves)
+            queries.append((line, expression))
+    if not queries:
+        print("No queries to run.")
+        return {}
+
+    # which queries each phrase can make true; a query only matches segments that contain one of its phrases
+    queries_by_leaf = {}
+    for number, (_, expression) in enumerate(queries):
+        for leaf in positive_leaves(expression):
+            queries_by_leaf.setdefault(leaf, set()).add(number)
+
+    start_time = time.perf_counter()
+    goto, fail, outputs = build_automaton(leaves)
+    longest = max(len(phrase) for phrase in leaves)
+    results = [[] for _ in queries]
+
+    update_search_index(folder_path)
+    connection = open_search_index(folder_path)
+    try:
+        rows = connection.execute(
+            "SELECT files.name, segments.seg, segments.start_ms, segments.text FROM segments "
+            "JOIN files ON files.id = segments.file_id ORDER BY files.name, segments.seg"
         )
+        segment_count = 0
+        for srt_name, file_rows in itertools.groupby(rows, key=lambda row: row[0]):
+            # the automaton runs over the whole transcript, so phrases can run on from one segment into the next;
+            # a phrase is credited to the segment it starts in
+            state = 0
+            recent_segments = deque(maxlen=longest)
+            found = {}  # segment number -> leaves found in it
+            segments = {}
+            for _, seg, start_ms, text in file_rows:
+                segment_count += 1
+                segments[seg] = (start_ms, text)
+                for token in tokenize(text):
+                    recent_segments.append(seg)
+                    while state and token not in goto[state]:
+                        state = fail[state]
+                    state = goto[state].get(token, 0)
+                    for leaf, length in outputs[state]:
+                        found.setdefault(recent_segments[-length], set()).add(leaf)
+
+            for seg, present in sorted(found.items()):
+                for number in sorted(set().union(*(queries_by_leaf.get(leaf, ()) for leaf in present))):
+                    if evaluate_batch_query(queries[number][1], present):
+                        start_ms, text = segments[seg]
+                        results[number].append((srt_name, format_timestamp(start_ms / 1000), text.strip()))
+    finally:
+        connection.close()
+    elapsed = time.perf_counter() - start_time
+
+    # one tab-separated file per query, plus a summary of the counts
+    os.makedirs(output_folder, exist_ok=True)
+    with open(os.path.join(output_folder, "summary.tsv"), "w", encoding="utf-8") as summary_file:
+        summary_file.write("query\tmatches\tfile\n")
+        for number, ((query, _), matches) in enumerate(zip(queries, results), 1):
+            slug = re.sub(r"\W+", "_", query).strip("_")[:50]
+            filename = f"{number:04}_{slug}.tsv"
+            with open(os.path.join(output_folder, filename), "w", encoding="utf-8") as result_file:
+                result_file.write("video\ttimestamp\ttext\n")
+                for srt_name, timestamp, text in matches:
+                    result_file.write(f"{srt_name}\t{timestamp}\t{text}\n")
+            summary_file.write(f"{query}\t{len(matches)}\t{filename}\n")
+
+    record_span("batch_search", elapsed, queries=len(queries), segments=segment_count,
+                matches=sum(len(matches) for matches in results))
+    print(f"Ran {len(queries)} queries over {segment_count} segments in {elapsed:.2f} seconds; "
+          f"{sum(len(matches) for matches in results)} match(es) in total.")
+    print(f"Results saved to {output_folder}")
+    return {query: matches for (query, _), matches in zip(queries, results)}
 
-        # Structure HTML with only one line break after the match
-        html_content += f"""
-            <li class="result">
-                <div class="timestamp"><strong>{video_name} - {timestamp}</strong></div>
-                <div>
-                    <span class="context-before"> {highlighted_context_text.split('[Match]')[0]}</span><br>
-                    <span class="match">[Match] {highlighted_context_text.split('[Match]')[1].split('[After]')[0]}</span><br>
-                    <span class="context-after">[After] {highlighted_context_text.split('[After]')[1]}</span><br>
-                    <img src="{screenshot_filename}" alt="Screenshot for {timestamp}" class="screenshot">
-                </div>
-            </li>
-        """
-    
-    html_content += """
-        </ul>
-    </body>
-    </html>
-    """
 
-    with open(html_path, "w", encoding="utf-8") as file:
-        file.write(html_content)
+# queries look like:  budget AND (forecast OR "cash flow") AND NOT draft
+# bare words next to each other form a phrase; a quoted phrase can hold operator words; NOT binds tightest,
+# then AND (which can be left out between phrases), then OR
+def parse_batch_query(text, leaves):
+    """Parse one batch query into a nested ('leaf'|'and'|'or'|'not', ...) tuple, registering its phrases."""
+    parts = re.findall(r'"[^"]*"|\(|\)|[^\s()"]+', text)
+    position = 0
+
+    def peek():
+        return parts[position] if position < len(parts) else None
+
+    def take():
+        nonlocal position
+        position += 1
+        return parts[position - 1]
+
+    def parse_or():
+        operands = [parse_and()]
+        while peek() == "OR":
+            take()
+            operands.append(parse_and())
+        return operands[0] if len(operands) == 1 else ("or", operands)
+
+    def parse_and():
+        operands = [parse_not()]
+        while peek() not in (None, ")", "OR"):
+            if peek() == "AND":
+                take()
+            operands.append(parse_not())
+        return operands[0] if len(operands) == 1 else ("and", operands)
+
+    def parse_not():
+        if peek() == "NOT":
+            take()
+            return ("not", parse_not())
+        return parse_phrase()
+
+    def parse_phrase():
+        part = peek()
+        if part is None or part in (")", "AND", "OR"):
+            raise ValueError(f"expected a term in {text!r}")
+        if part == "(":
+            take()
+            expression = parse_or()
+            if peek() != ")":
+                raise ValueError(f"missing ')' in {text!r}")
+            take()
+            return expression
+
+        if part.startswith('"'):
+            words = take()[1:-1]
+        else:
+            run = []
+            while peek() is not None and peek() not in ("(", ")", "AND", "OR", "NOT") and not peek().startswith('"'):
+                run.append(take())
+            words = " ".join(run)
+        tokens = tuple(tokenize(words))
+        if not tokens:
+            raise ValueError(f"{words!r} has nothing to search for")
+        return ("leaf", leaves.setdefault(tokens, len(leaves)))
+
+    expression = parse_or()
+    if peek() is not None:
+        raise ValueError(f"unexpected {peek()!r} in {text!r}")
+    return expression
+
+
+def evaluate_batch_query(expression, present):
+    """Return whether a parsed batch query holds for a segment containing the given leaves."""
+    kind = expression[0]
+    if kind == "leaf":
+        return expression[1] in present
+    if kind == "and":
+        return all(evaluate_batch_query(operand, present) for operand in expression[1])
+    if kind == "or":
+        return any(evaluate_batch_query(operand, present) for operand in expression[1])
+    return not evaluate_batch_query(expression[1], present)
+
+
+def positive_leaves(expression, negated=False):
+    """Return the leaves of a parsed batch query that are not under a NOT."""
+    kind = expression[0]
+    if kind == "leaf":
+        return set() if negated else {expression[1]}
+    if kind == "not":
+        return positive_leaves(expression[1], not negated)
+    return set().union(*(positive_leaves(operand, negated) for operand in expression[1]))
+
+
+# Aho-Corasick over word tokens: every phrase is found in a single left-to-right pass
+def build_automaton(phrases):
+    """Build the goto/fail/output tables for {tuple of tokens: phrase number}."""
+    goto, fail, outputs = [{}], [0], [[]]
+    for tokens, number in phrases.items():
+        state = 0
+        for token in tokens:
+            if token not in goto[state]:
+                goto.append({})
+                fail.append(0)
+                outputs.append([])
+                goto[state][token] = len(goto) - 1
+            state = goto[state][token]
+        outputs[state].append((number, len(tokens)))
+
+    # breadth first, so every state's fail link points at an already finished, shallower state
+    pending = deque(goto[0].values())
+    while pending:
+        state = pending.popleft()
+        for token, next_state in goto[state].items():
+            pending.append(next_state)
+            fallback = fail[state]
+            while fallback and token not in goto[fallback]:
+                fallback = fail[fallback]
+            fail[next_state] = goto[fallback].get(token, 0)
+            outputs[next_state] = outputs[next_state] + outputs[fail[next_state]]
+    return goto, fail, outputs
+
+
+# the video a transcript belongs to
+def find_video(folder_path, base_name):
+    """Return the path of the video with this base name, or None if there is none."""
+    for ext in ['.mp4', '.mkv', '.avi', '.mov']:
+        potential_video_path = os.path.join(folder_path, base_name + ext)
+        if os.path.exists(potential_video_path):
+            return potential_video_path
+    return None
+
+
+# the matched subtitle with the ones either side of it
+def format_context(segments, i):
+    """Format segment i of {segment number: segment} with its previous and next segments, if they exist."""
+    prev_segment = segments.get(i - 1)
+    segment = segments[i]
+    next_segment = segments.get(i + 1)
+
+    # shown to the whole second (H:MM:SS), now that the index keeps the milliseconds
+    context_text = ""
+    if prev_segment:
+        context_text += f"[Before] {context_time(prev_segment)}: {prev_segment['text']}\n"
+    context_text += f"[Match] {context_time(segment)}: {segment['text']}\n"
+    if next_segment:
+        context_text += f"[After] {context_time(next_segment)}: {next_segment['text']}"
+    return context_text
+
+
+def context_time(segment):
+    """Return a segment's start time as H:MM:SS."""
+    return str(timedelta(seconds=int(segment['start'].total_seconds())))
+
+
+# print the approximate matches for a term and offer screenshots and HTML for them
+def fuzzy_search_in_transcripts(folder_path, search_term):
+    """Run a fuzzy (misspelling- and sound-alike-tolerant) search and show the ranked results."""
+    start_time = time.perf_counter()
+    hits = fuzzy_search(folder_path, search_term)
+    elapsed = time.perf_counter() - start_time
+    record_span("fuzzy_search", elapsed, term=search_term, results=len(hits))
+    print(f"Found {len(hits)} approximate match(es) in {elapsed * 1000:.0f} ms.")
+
+    all_timestamps = []
+    screenshot_jobs = {}
+    for hit in hits:
+        segment = hit['segments'][hit['seg']]
+        print(f"{hit['srt']} {format_timestamp(segment['start'].total_seconds())} "
+              f"(distance {hit['distance']}, matched {', '.join(hit['matched'])}): {segment['text']}")
+
+        video_name = hit['srt']
+        video_path = find_video(folder_path, os.path.splitext(video_name)[0])
+        if video_path:
+            all_timestamps.append((video_name, format_timestamp(segment['start'].total_seconds()),
+                                   format_context(hit['segments'], hit['seg'])))
+            screenshot_jobs.setdefault(video_path, []).append((segment['start'].total_seconds(), segment['text']))
+
+    if all_timestamps:
+        user_choice = input("Do you want screenshots and HTML for these results? [Will be saved in Screenshots] (y/n): ")
+        if user_choice.lower() == 'y':
+            capture_screenshots(screenshot_jobs, search_term)
+            generate_html(all_timestamps, search_term)
+    return hits
+
+
+# the start of every page of the HTML report; {title} and {navigation} are filled in per page
+html_page_head = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title}</title>
+    <style>
+        body {{
+            font-family: Arial, sans-serif;
+            color: #333;
+            background-color: #f4f4f4;
+            line-height: 1.6;
+        }}
+        h1 {{
+            color: #00509E;
+            border-bottom: 2px solid #ddd;
+            padding-bottom: 10px;
+            margin-bottom: 20px;
+        }}
+        h2 {{
+            color: #00509E;
+            font-size: 1.1em;
+            margin-top: 25px;
+        }}
+        .result {{
+            background-color: #ffffff;
+            border: 1px solid #ddd;
+            border-radius: 5px;
+            padding: 15px;
+            margin-bottom: 15px;
+            box-shadow: 1px 1px 5px rgba(0, 0, 0, 0.1);
+        }}
+        .context-before, .context-after {{
+            display: inline;  /* Show context by default */
+            color: #555;
+        }}
+        .screenshot {{
+            display: inline; /* Ensure screenshots are visible on load */
+            margin-top: 10px;
+            max-width: 100%;
+            height: auto;
+            border-radius: 5px;
+            border: 1px solid #ddd;
+        }}
+        .toggle-button, .global-toggle-button {{
+            color: #00509E;
+            cursor: pointer;
+            text-decoration: underline;
+            font-size: 0.9em;
+            margin-right: 15px;
+        }}
+        .toggle-button:hover, .global-toggle-button:hover {{
+            text-decoration: none;
+            background-color: #e0f1ff;
+            padding: 3px;
+            border-radius: 3px;
+        }}
+        .highlight {{
+            background-color: yellow;
+            font-weight: bold;
+        }}
+        .timestamp {{
+            font-weight: bold;
+            color: #00509E;
+            margin-top: 5px;
+        }}
+        .pages a, .pages strong {{
+            margin-right: 8px;
+        }}
+    </style>
+    <script>
+        function toggleContext() {{
+            var contexts = document.querySelectorAll('.context-before, .context-after');
+            var isCurrentlyShown = contexts.length && contexts[0].style.display !== "none";
+            contexts.forEach(context => {{
+                context.style.display = isCurrentlyShown ? "none" : "inline";
+            }});
+        }}
+
+        function toggleAllScreenshots() {{
+            var screenshots = document.querySelectorAll('.screenshot');
+            var isCurrentlyShown = screenshots.length && screenshots[0].style.display !== "none";
+            screenshots.forEach(screenshot => {{
+                screenshot.style.display = isCurrentlyShown ? "none" : "inline";
+            }});
+        }}
+    </script>
+</head>
+<body>
+    <h1>{title}</h1>
+    <button class="global-toggle-button" onclick="toggleContext()">Show/Hide All Context</button>
+    <button class="global-toggle-button" onclick="toggleAllScreenshots()">Show/Hide All Screenshots</button>
+    {navigation}
+"""
+
+
+# the report is written a page at a time, straight to disk, so big result sets cost no more memory than small ones;
+# the thumbnails only load as they scroll into view
+def generate_html(timestamps, search_term):
+    """Write HTML pages of results to the screenshots folder, grouped by video, with context and screenshot toggles."""
+    start_time = time.perf_counter()
+    page_count = max(1, math.ceil(len(timestamps) / html_page_size))
+    highlight = re.compile(re.escape(html.escape(search_term)), re.IGNORECASE)
+
+    for page in range(page_count):
+        navigation = html_page_links(page, page_count)
+        title = f"Search Results for &quot;{html.escape(search_term)}&quot;"
+        if page_count > 1:
+            title += f" (page {page + 1} of {page_count})"
+
+        with open(os.path.join(screenshot_folder, html_page_name(page)), "w", encoding="utf-8") as file:
+            file.write(html_page_head.format(title=title, navigation=navigation))
+            current_video = None
+            for video_name, timestamp, context_text in timestamps[page * html_page_size:(page + 1) * html_page_size]:
+                if video_name != current_video:
+                    if current_video is not None:
+                        file.write("    </ul>\n")
+                    file.write(f"    <h2>{html.escape(video_name)}</h2>\n    <ul>\n")
+                    current_video = video_name
+                file.write(html_result(video_name, timestamp, context_text, highlight))
+            if current_video is not None:
+                file.write("    </ul>\n")
+            file.write(f"    {navigation}\n</body>\n</html>\n")
+
+    # pages left over from an earlier, longer report
+    page = page_count
+    while os.path.exists(os.path.join(screenshot_folder, html_page_name(page))):
+        os.remove(os.path.join(screenshot_folder, html_page_name(page)))
+        page += 1
+    record_span("write_html", time.perf_counter() - start_time, results=len(timestamps), pages=page_count)
 
     # Open the generated HTML in the default web browser
+    html_path = os.path.join(screenshot_folder, html_page_name(0))
     webbrowser.open(f"file://{html_path}")
-    print(f"HTML file with timestamps saved to {html_path}")
+    print(f"HTML file with timestamps saved to {html_path}"
+          + (f" (and {page_count - 1} more page(s))" if page_count > 1 else ""))
+
+
+def html_page_name(page):
+    """Return the file name of a page of the HTML report (the first keeps the old name)."""
+    return "search_results.html" if page == 0 else f"search_results_{page + 1}.html"
+
+
+def html_page_links(page, page_count):
+    """Return the links between the pages of the report, or nothing if there is only one."""
+    if page_count == 1:
+        return ""
+    links = [f"<strong>{number + 1}</strong>" if number == page else
+             f'<a href="{html_page_name(number)}">{number + 1}</a>' for number in range(page_count)]
+    return f'<div class="pages">Pages: {" ".join(links)}</div>'
+
+
+# one result: its context, split into its lines once, and a thumbnail linking to the full screenshot
+def html_result(video_name, timestamp, context_text, highlight):
+    """Return the HTML list item for one result."""
+    timestamp = timestamp.split('.')[0]
+    screenshot_name = f"{os.path.splitext(video_name)[0]}_screenshot_{timestamp.replace(':', '-')}.{screenshot_format}"
+    image_name = thumbnail_name(screenshot_name)
+    if not os.path.exists(os.path.join(screenshot_folder, image_name)):
+        image_name = screenshot_name  # taken before there were thumbnails
+
+    context = {}
+    for line in context_text.split("\n"):
+        label, _, text = line.partition("] ")
+        context[label] = highlight.sub(lambda match: f"<span class='highlight'>{match.group(0)}</span>",
+                                       html.escape(text))
+    lines = [f'<span class="{css_class}">{label}] {context[label]}</span><br>'
+             for label, css_class in (("[Before", "context-before"), ("[Match", "match"), ("[After", "context-after"))
+             if label in context]
+
+    return f"""        <li class="result">
+            <div class="timestamp"><strong>{html.escape(video_name)} - {timestamp}</strong></div>
+            <div>
+                {"".join(lines)}
+                <a href="{html.escape(screenshot_name)}"><img src="{html.escape(image_name)}" loading="lazy" decoding="async" width="{thumbnail_width}" alt="Screenshot for {timestamp}" class="screenshot"></a>
+            </div>
+        </li>
+"""
+
+
+# where the report's small copy of a screenshot goes, relative to the screenshots folder
+def thumbnail_name(screenshot_name):
+    """Return the thumbnail file name for a screenshot file name."""
+    return f"thumbnails/{os.path.splitext(screenshot_name)[0]}.{thumbnail_format}"
 
 
 # open the video, grab the frame at the timestamp, overlay the caption, save a png of the result.
 def take_screenshot(video_path, time, overlay_text, match_word):
     """Capture a screenshot from a video at a specific time with overlay text and save to screenshots folder."""
-    # Format the timestamp with zero padding for filenames
-    formatted_time = format_timestamp(time).replace(":", "-")
+    take_screenshots(video_path, [(time, overlay_text)], match_word)
+
+
+# grab every requested frame of one video with as few ffmpeg launches as possible
+def take_screenshots(video_path, shots, match_word):
+    """Capture all (time, overlay text) screenshots for one video, batching the seeks into shared ffmpeg runs."""
     video_name = os.path.splitext(os.path.basename(video_path))[0]
-    output_path = os.path.join(screenshot_folder, f"{video_name}_screenshot_{formatted_time}.png")
+    cache_folder = os.path.join(frame_cache_folder, video_content_hash(video_path))
+    os.makedirs(cache_folder, exist_ok=True)
+    os.makedirs(os.path.join(screenshot_folder, "thumbnails"), exist_ok=True)
 
-    try:
-        adjusted_time = time + 0.1  # Small adjustment for frame sync
-        temp_path = output_path.replace(".png", "_temp.png")
+    # one screenshot per output file; the frames are pulled in timestamp order so the seeks only move forward
+    pending = {}
+    for time, overlay_text in shots:
+        pending.setdefault(screenshot_path(video_path, time), (time, overlay_text))
+    pending = sorted(pending.items(), key=lambda item: item[1][0])
 
-        # Capture screenshot using ffmpeg
-        ffmpeg.input(video_path, ss=adjusted_time).output(temp_path, vframes=1).run(overwrite_output=True)
-        print(f"Screenshot saved to {temp_path}")
+    # frames already in the cache skip decoding entirely; touching them keeps them at the young end of the LRU.
+    # Cached frames are stored as PPM, which is raw RGB behind a short header, so caching costs no extra encode.
+    for batch_start in range(0, len(pending), screenshot_batch_size):
+        batch = pending[batch_start:batch_start + screenshot_batch_size]
+        frames = {}
+        missing = []
+        for output_path, (time, overlay_text) in batch:
+            frame_path = os.path.join(cache_folder, f"{round(time * 1000)}.ppm")
+            if os.path.exists(frame_path):
+                os.utime(frame_path)
+            else:
+                missing.append((time, frame_path))
 
-        # Open screenshot for overlay processing
-        image = Image.open(temp_path)
-        draw = ImageDraw.Draw(image)
+        if missing:
+            with span("extract_frames", video=video_name) as fields:
+                images = extract_frames(video_path, [time for time, _ in missing])
+                fields['frames'] = sum(image is not None for image in images)
+            for (_, frame_path), image in zip(missing, images):
+                if image is None:
+                    continue
+                # only complete frames are published to the cache (and two searches may be writing the same one)
+                partial_path = f"{frame_path}.{threading.get_ident()}.partial"
+                image.save(partial_path, "PPM")
+                os.replace(partial_path, frame_path)
+                frames[frame_path] = image
 
-        # Set font and calculate text dimensions
-        font_size = 20
-        try:
-            font = ImageFont.truetype("arial.ttf", font_size)
-        except IOError:
-            font = ImageFont.load_default()
+        with span("write_screenshots", video=video_name, screenshots=0,
+                  cached_frames=len(batch) - len(missing)) as fields:
+            for output_path, (time, overlay_text) in batch:
+                frame_path = os.path.join(cache_folder, f"{round(time * 1000)}.ppm")
+                image = frames.pop(frame_path, None)
+                if image is None and os.path.exists(frame_path):
+                    with Image.open(frame_path) as cached:
+                        image = cached.convert("RGB")
+                if image is None:
+                    print(f"No frame could be captured at {format_timestamp(time)} in {video_path}")
+                    continue
+
+                # Render the overlay straight onto the frame and encode it once. Like the cached frames, both
+                # files are written aside and swapped in, as the service may be taking the same screenshot twice
+                draw_caption(image, overlay_text, match_word)
+                partial_path = f"{output_path}.{threading.get_ident()}.partial"
+                if screenshot_format == "jpg":
+                    image.save(partial_path, "JPEG", quality=90)
+                else:
+                    image.save(partial_path, screenshot_format.upper())
+                os.replace(partial_path, output_path)
+
+                # and a small copy for the HTML report, which links it to the full screenshot
+                image.thumbnail((thumbnail_width, image.height), Image.Resampling.BILINEAR, reducing_gap=2.0)
+                thumbnail_path = os.path.join(screenshot_folder, thumbnail_name(os.path.basename(output_path)))
+                partial_path = f"{thumbnail_path}.{threading.get_ident()}.partial"
+                image.save(partial_path, "JPEG" if thumbnail_format == "jpg" else thumbnail_format.upper(), quality=80)
+                os.replace(partial_path, thumbnail_path)
+                fields['screenshots'] += 1
+                print(f"Screenshot with overlay saved to {output_path}")
+
+
+# screenshots are named after their video and the whole second they were taken at
+def screenshot_path(video_path, seconds):
+    """Return where the screenshot of a video at a time is saved."""
+    video_name = os.path.splitext(os.path.basename(video_path))[0]
+    formatted_time = format_timestamp(seconds).replace(":", "-")
+    return os.path.join(screenshot_folder, f"{video_name}_screenshot_{formatted_time}.{screenshot_format}")
 
-        text_width, text_height = draw.textbbox((0, 0), overlay_text, font=font)[2:]
-        while text_width > image.width - 20 and font_size > 10:
-            font_size -= 1
-            font = ImageFont.truetype("arial.ttf", font_size)
-            text_width, text_height = draw.textbbox((0, 0), overlay_text, font=font)[2:]
-
-        # Draw overlay with background
-        text_position = (10, image.height - text_height - 20)
-        background_position = (text_position[0] - 5, text_position[1] - 5,
-                               text_position[0] + text_width + 5, text_position[1] + text_height + 5)
-        draw.rectangle(background_position, fill=(0, 0, 0))
-        
-        # Highlight match word
-        pattern = re.compile(rf"\b{re.escape(match_word)}\b[.,!?]*", re.IGNORECASE)
-        parts = pattern.split(overlay_text)
-        matches = pattern.findall(overlay_text)
-
-        x_offset = text_position[0]
-        for i, part in enumerate(parts):
-            draw.text((x_offset, text_position[1]), part, font=font, fill=(255, 255, 255))
-            x_offset += draw.textlength(part, font=font)
-            if i < len(matches):
-                draw.text((x_offset, text_position[1]), matches[i], font=font, fill=(255, 0, 0))
-                x_offset += draw.textlength(matches[i], font=font)
-
-        # Save final image and clean up
-        image.save(output_path)
-        print(f"Screenshot with overlay saved to {output_path}")
-        image.close()
-        os.remove(temp_path)
 
+# decode a batch of frames from one video into memory with a single ffmpeg run
+def extract_frames(video_path, times):
+    """Return one RGB image per timestamp (None where no frame could be read), read from ffmpeg's stdout."""
+    width, height = video_frame_size(video_path)
+    frame_bytes = width * height * 3
+
+    # one fast-seeking input per timestamp, each cut to its first frame, all joined into a single raw stream
+    streams = [ffmpeg.input(video_path, ss=time + 0.1)  # Small adjustment for frame sync
+               .video.trim(end_frame=1).setpts("PTS-STARTPTS")
+               for time in times]
+    joined = streams[0] if len(streams) == 1 else ffmpeg.concat(*streams, v=1, a=0)
+    try:
+        # passthrough keeps ffmpeg from duplicating or dropping frames to fit a constant output rate
+        raw, _ = (joined.output("pipe:", format="rawvideo", pix_fmt="rgb24", fps_mode="passthrough")
+                  .run(capture_stdout=True, capture_stderr=True))
     except ffmpeg.Error as e:
         error_message = e.stderr.decode() if e.stderr else "No error message provided by ffmpeg."
         print("ffmpeg error:", error_message)
+        return [None] * len(times)
+
+    if len(raw) == frame_bytes * len(times):
+        raw = memoryview(raw)
+        return [Image.frombytes("RGB", (width, height), raw[i * frame_bytes:(i + 1) * frame_bytes])
+                for i in range(len(times))]
+    if len(times) == 1:
+        return [None]
+    # a frame is missing (e.g. a seek past the end), so there is no telling which; fetch them one by one
+    print(f"ffmpeg returned {len(raw) // frame_bytes} of {len(times)} frames from {video_path}; "
+          f"extracting them one at a time")
+    return [extract_frames(video_path, [time])[0] for time in times]
+
+
+# the size of the frames ffmpeg will hand back for a video, accounting for rotated (phone) footage
+@functools.lru_cache(maxsize=256)
+def video_frame_size(video_path):
+    """Return the (width, height) of the decoded frames of a video."""
+    stream = next(s for s in ffmpeg.probe(video_path)["streams"] if s["codec_type"] == "video")
+    width, height = int(stream["width"]), int(stream["height"])
+    rotation = stream.get("tags", {}).get("rotate")
+    for side_data in stream.get("side_data_list", []):
+        rotation = side_data.get("rotation", rotation)
+    if rotation is not None and abs(int(float(rotation))) % 180 == 90:
+        width, height = height, width
+    return width, height
+
+
+# run the screenshot batches of several videos side by side
+def capture_screenshots(jobs, match_word):
+    """Take the screenshots for {video path: [(time, overlay text), ...]} on a bounded pool, one video per worker."""
+    if not jobs:
+        return
+    with span("screenshots", videos=len(jobs), screenshots=sum(len(shots) for shots in jobs.values())):
+        with ThreadPoolExecutor(max_workers=min(screenshot_workers, len(jobs))) as executor:
+            futures = [executor.submit(take_screenshots, video_path, shots, match_word)
+                       for video_path, shots in jobs.items()]
+            for future in futures:
+                future.result()
+        prune_cache(frame_cache_folder, frame_cache_max_bytes)
+
+
+# identify a video by its contents rather than its name, so cached frames survive renames
+def video_content_hash(video_path):
+    """Return a hash of a video's size and sampled contents (start, middle and end)."""
+    stat = os.stat(video_path)
+    key = (os.path.abspath(video_path), stat.st_size, stat.st_mtime)
+    with video_hashes_lock:
+        if key in video_hashes:
+            return video_hashes[key]
+
+    # hashing whole multi-GB videos would cost more than the decode we are trying to save
+    sample_size = 1024 * 1024
+    digest = hashlib.sha1(str(stat.st_size).encode())
+    with open(video_path, "rb") as video_file:
+        for offset in (0, stat.st_size // 2, max(stat.st_size - sample_size, 0)):
+            video_file.seek(offset)
+            digest.update(video_file.read(sample_size))
+
+    with video_hashes_lock:
+        video_hashes[key] = digest.hexdigest()
+    return video_hashes[key]
+
+
+# keep a cache folder under its size limit by dropping the least recently used files
+def prune_cache(cache_folder, max_bytes):
+    """Evict the oldest-used files (by mtime, which cache hits refresh) until the folder fits in max_bytes."""
+    frames = []
+    for root, _, filenames in os.walk(cache_folder):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            frames.append((stat.st_mtime, stat.st_size, path))
+
+    total_size = sum(size for _, size, _ in frames)
+    for _, size, path in sorted(frames):
+        if total_size <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            continue  # still open elsewhere (Windows will not delete a file a transcription has mapped)
+        total_size -= size
+
+
+# draw the caption along the bottom of a frame, with the matched word in red
+def draw_caption(image, overlay_text, match_word):
+    """Overlay the subtitle text onto an image, highlighting the match word."""
+    draw = ImageDraw.Draw(image)
+
+    # Set font and calculate text dimensions
+    font_size = fit_font_size(overlay_text, image.width - 20)
+    font = load_font(font_size)
+    text_width, text_height = measure_text(overlay_text, font_size)
+
+    # Draw overlay with background
+    text_position = (10, image.height - text_height - 20)
+    background_position = (text_position[0] - 5, text_position[1] - 5,
+                           text_position[0] + text_width + 5, text_position[1] + text_height + 5)
+    draw.rectangle(background_position, fill=(0, 0, 0))
+
+    # Highlight match word
+    pattern = re.compile(rf"\b{re.escape(match_word)}\b[.,!?]*", re.IGNORECASE)
+    parts = pattern.split(overlay_text)
+    matches = pattern.findall(overlay_text)
+
+    x_offset = text_position[0]
+    for i, part in enumerate(parts):
+        draw.text((x_offset, text_position[1]), part, font=font, fill=(255, 255, 255))
+        x_offset += text_length(part, font_size)
+        if i < len(matches):
+            draw.text((x_offset, text_position[1]), matches[i], font=font, fill=(255, 0, 0))
+            x_offset += text_length(matches[i], font_size)
+
+
+# fonts are loaded from disk once per size
+@functools.lru_cache(maxsize=None)
+def load_font(font_size):
+    """Return the caption font at the given size, falling back to PIL's default font."""
+    try:
+        return ImageFont.truetype("arial.ttf", font_size)
+    except IOError:
+        return ImageFont.load_default()
+
+
+# text measurements are cached too, as the same captions come back for every search that hits them
+@functools.lru_cache(maxsize=4096)
+def measure_text(text, font_size):
+    """Return the (width, height) of the text's bounding box at the given font size."""
+    return load_font(font_size).getbbox(text)[2:]
+
+
+@functools.lru_cache(maxsize=4096)
+def text_length(text, font_size):
+    """Return the advance width of the text at the given font size."""
+    return load_font(font_size).getlength(text)
+
+
+# largest font size (20 down to 10) at which the caption fits the frame
+@functools.lru_cache(maxsize=4096)
+def fit_font_size(text, max_width):
+    """Pick the font size for a caption so that it fits within max_width where possible."""
+    font_size = 20
+    text_width = measure_text(text, font_size)[0]
+    if text_width > max_width:
+        # text width scales roughly linearly with size, so jump close to the answer before stepping down
+        font_size = max(10, min(19, int(font_size * max_width / text_width)))
+        while font_size < 20 and measure_text(text, font_size + 1)[0] <= max_width:
+            font_size += 1
+        while measure_text(text, font_size)[0] > max_width and font_size > 10:
+            font_size -= 1
+    return font_size
 
 
 # format the timestamp to make it look better (prior to this, we had stuff like 3:5:34 instead of 3:05:34
@@ -445,22 +2254,303 @@ def transcribe_specific_videos(folder_path):
         except ValueError:
             print("Invalid input. Please enter a number or leave blank to finish.")
 
-    for filename in selected_videos:
-        video_path = os.path.join(folder_path, filename)
+    transcribe_videos([os.path.join(folder_path, filename) for filename in dict.fromkeys(selected_videos)])
+
+
+# time a stage of the work. Numbers the caller puts in the yielded dict (frames, audio_seconds...) are counted
+# as that stage's units; anything else (a video name, say) is only logged.
+@contextlib.contextmanager
+def span(stage, **fields):
+    """Time the body of a with block and record it as one span of the given stage."""
+    global open_spans
+    with metrics_lock:
+        open_spans += 1
+    start_time = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        with metrics_lock:
+            open_spans -= 1
+        record_span(stage, time.perf_counter() - start_time, **fields)
+
+
+# one JSON line per span, appended to metrics.jsonl (worker processes append to the same file; only the main
+# process writes metrics.prom, and only once no span is left open)
+def record_span(stage, seconds, **fields):
+    """Log a finished span and add it to the totals."""
+    record = {'time': round(time.time(), 3), 'stage': stage, 'seconds': round(seconds, 6), 'pid': os.getpid(), **fields}
+    global metrics_log_file
+    with metrics_lock:
+        log_path = os.path.join(metrics_folder, "metrics.jsonl")
+        if metrics_log_file is None or metrics_log_file.name != log_path:
+            if metrics_log_file:
+                metrics_log_file.close()
+            os.makedirs(metrics_folder, exist_ok=True)
+            metrics_log_file = open(log_path, "a", encoding="utf-8", buffering=1)
+        metrics_log_file.write(json.dumps(record, default=str) + "\n")
+    count_span(stage, seconds, **fields)
+    if open_spans == 0 and multiprocessing.parent_process() is None:
+        write_metrics()
+
+
+def count_span(stage, seconds, **fields):
+    """Add a span to the running totals without logging it (for spans a worker process has already logged)."""
+    with metrics_lock:
+        totals = metric_totals.setdefault(stage, {'runs': 0, 'seconds': 0.0})
+        totals['runs'] += 1
+        totals['seconds'] += seconds
+        for unit, amount in fields.items():
+            if unit in metric_units and isinstance(amount, (int, float)) and not isinstance(amount, bool):
+                totals[unit] = totals.get(unit, 0) + amount
+
+
+# the totals in the Prometheus text format, for a node_exporter textfile collector or a quick look
+def write_metrics():
+    """Rewrite metrics.prom from the running totals."""
+    with metrics_lock:
+        stages = sorted((stage, dict(totals)) for stage, totals in metric_totals.items())
+    lines = [
+        "# HELP vidtrans_stage_seconds_total Wall time spent in each stage.",
+        "# TYPE vidtrans_stage_seconds_total counter",
+        *(f'vidtrans_stage_seconds_total{{stage="{stage}"}} {totals["seconds"]:.6f}' for stage, totals in stages),
+        "# HELP vidtrans_stage_runs_total Times each stage ran.",
+        "# TYPE vidtrans_stage_runs_total counter",
+        *(f'vidtrans_stage_runs_total{{stage="{stage}"}} {totals["runs"]}' for stage, totals in stages),
+        "# HELP vidtrans_stage_units_total Work done by each stage (frames, segments, audio seconds...).",
+        "# TYPE vidtrans_stage_units_total counter",
+    ]
+    units = [(stage, unit, amount, totals['seconds']) for stage, totals in stages
+             for unit, amount in totals.items() if unit not in ('runs', 'seconds')]
+    lines += [f'vidtrans_stage_units_total{{stage="{stage}",unit="{unit}"}} {amount:g}'
+              for stage, unit, amount, _ in units]
+    lines += ["# HELP vidtrans_stage_units_per_second Throughput of each stage.",
+              "# TYPE vidtrans_stage_units_per_second gauge"]
+    lines += [f'vidtrans_stage_units_per_second{{stage="{stage}",unit="{unit}"}} {amount / seconds:g}'
+              for stage, unit, amount, seconds in units if seconds]
+
+    # seconds of work per second of audio: under 1 is faster than real time
+    chunks = dict(stages).get("transcribe_chunk")
+    if chunks and chunks.get('audio_seconds'):
+        lines += ["# HELP vidtrans_transcription_real_time_factor Transcription time per second of audio.",
+                  "# TYPE vidtrans_transcription_real_time_factor gauge",
+                  f"vidtrans_transcription_real_time_factor {chunks['seconds'] / chunks['audio_seconds']:g}"]
+
+    os.makedirs(metrics_folder, exist_ok=True)
+    prom_path = os.path.join(metrics_folder, "metrics.prom")
+    partial_path = f"{prom_path}.{threading.get_ident()}.partial"
+    with open(partial_path, "w", encoding="utf-8") as prom_file:
+        prom_file.write("\n".join(lines) + "\n")
+    os.replace(partial_path, prom_path)
+
+
+# headless mode: a small HTTP service over TCP or a Unix socket that keeps the search index (and, if asked, the
+# Whisper model) warm. Every response is JSON lines, and search results are sent as they are found:
+#   GET /search?q=term[&screenshots=1]  one line per match, then one per video whose screenshots are done
+#   GET /transcribe?video=name.mp4      transcribe a video in the folder, save its transcripts and index them
+#   GET /status
+class SearchService:
+    """The state the service keeps between requests: its thread pools and per-thread index connections."""
+
+    def __init__(self, preload_model=False):
+        self.searches = ThreadPoolExecutor(max_workers=serve_search_threads, thread_name_prefix="search")
+        self.screenshots = ThreadPoolExecutor(max_workers=screenshot_workers, thread_name_prefix="screenshots")
+        self.transcriptions = ThreadPoolExecutor(max_workers=1, thread_name_prefix="whisper")  # one model, one job
+        self.connections = threading.local()  # SQLite connections stay in the thread that opened them
+        self.refresh_lock = threading.Lock()
+        self.refreshed = time.monotonic()
+        self.started = time.monotonic()
+        update_search_index(folder_path)
+        if preload_model:
+            get_model()
+
+    def connection(self):
+        """Return this thread's connection to the search index, opening it on first use."""
+        if not hasattr(self.connections, 'index'):
+            self.connections.index = open_search_index(folder_path)
+        return self.connections.index
+
+    def refresh_index(self):
+        """Index new or changed transcripts, if the folder has not been checked for a while."""
+        with self.refresh_lock:
+            if time.monotonic() - self.refreshed >= serve_index_refresh_seconds:
+                update_search_index(folder_path)
+                self.refreshed = time.monotonic()
+
+    def search(self, search_term):
+        """Return the find_matches iterator for a search, run on one of the search threads."""
+        self.refresh_index()
+        return find_matches(folder_path, search_term, connection=self.connection())
+
+    def transcribe(self, video_path):
+        """Transcribe and index one video; returns its segment count."""
         transcript = transcribe_video(video_path)
         save_transcripts(transcript, video_path)
+        return len(transcript['segments'])
+
+    def status(self):
+        """Return what the service has loaded."""
+        return {
+            'folder': folder_path,
+            'transcripts': self.connection().execute("SELECT COUNT(*) FROM files").fetchone()[0],
+            'model': model_name,
+            'model_loaded': model is not None,
+            'uptime_seconds': round(time.monotonic() - self.started, 1),
+        }
+
+    async def handle(self, reader, writer):
+        """Answer one HTTP request."""
+        import asyncio
+        import urllib.parse
+
+        loop = asyncio.get_running_loop()
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            while await reader.readline() not in (b"\r\n", b"\n", b""):
+                pass  # headers; nothing here needs them
+            if len(request_line) < 2:
+                return
+            url = urllib.parse.urlsplit(request_line[1])
+            params = {key: values[-1] for key, values in urllib.parse.parse_qs(url.query).items()}
+
+            if url.path == "/search" and params.get('q'):
+                await self.stream_search(writer, params['q'], params.get('screenshots') == "1")
+            elif url.path == "/transcribe" and params.get('video'):
+                video_path = os.path.join(folder_path, os.path.basename(params['video']))
+                if not os.path.exists(video_path):
+                    await send_json_lines(writer, "404 Not Found", {'error': f"No video {params['video']}"})
+                    return
+                try:
+                    segments = await loop.run_in_executor(self.transcriptions, self.transcribe, video_path)
+                except Exception as e:
+                    await send_json_lines(writer, "500 Internal Server Error", {'error': str(e)})
+                    return
+                await send_json_lines(writer, "200 OK", {'video': params['video'], 'segments': segments})
+            elif url.path == "/status":
+                await send_json_lines(writer, "200 OK", await loop.run_in_executor(self.searches, self.status))
+            else:
+                await send_json_lines(writer, "404 Not Found",
+                                      {'error': "Try /search?q=term, /transcribe?video=name or /status"})
+        except ConnectionError:
+            pass  # the client went away
+        finally:
+            writer.close()
+
+    async def stream_search(self, writer, search_term, screenshots):
+        """Send each match as soon as its transcript has been searched, then report on the screenshots."""
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        start_time = time.perf_counter()
+        screenshot_jobs = []
+        await send_json_lines(writer, "200 OK")
+        with span("serve_search", term=search_term, results=0) as fields:
+            async for video_name, video_path, matches in iterate_in_thread(self.searches, self.search, search_term):
+                for match in matches:
+                    seconds = match['time'].total_seconds()
+                    writer.write(json_line({
+                        'video': video_name,
+                        'timestamp': match['timestamp'],
+                        'seconds': seconds,
+                        'context': match['context'],
+                        'screenshot': screenshot_path(video_path, seconds) if screenshots else None,
+                    }))
+                fields['results'] += len(matches)
+                if screenshots and matches:
+                    shots = [(match['time'].total_seconds(), match['overlay']) for match in matches]
+                    screenshot_jobs.append((video_name, loop.run_in_executor(
+                        self.screenshots, take_screenshots, video_path, shots, search_term)))
+                await writer.drain()
+
+            for video_name, job in screenshot_jobs:
+                try:
+                    await job
+                    writer.write(json_line({'screenshots_done': video_name}))
+                except Exception as e:
+                    writer.write(json_line({'screenshots_failed': video_name, 'error': str(e)}))
+                await writer.drain()
+            if screenshot_jobs:
+                self.screenshots.submit(prune_cache, frame_cache_folder, frame_cache_max_bytes)
 
+        writer.write(json_line({'done': True, 'results': fields['results'],
+                                'seconds': round(time.perf_counter() - start_time, 4)}))
+        await writer.drain()
+
+    def close(self):
+        """Stop the thread pools."""
+        for executor in (self.searches, self.screenshots, self.transcriptions):
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# an iterator that does blocking work (SQLite, file reads) consumed from the event loop without blocking it
+async def iterate_in_thread(executor, function, *args):
+    """Run function(*args) and its iteration on the executor, yielding the items as they come."""
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    items = asyncio.Queue()
+    finished = object()
+
+    def run():
+        try:
+            for item in function(*args):
+                loop.call_soon_threadsafe(items.put_nowait, item)
+        finally:
+            loop.call_soon_threadsafe(items.put_nowait, finished)
+
+    job = loop.run_in_executor(executor, run)
+    while (item := await items.get()) is not finished:
+        yield item
+    await job  # raises whatever went wrong in the thread
+
+
+def json_line(value):
+    """Encode a value as one line of JSON."""
+    return (json.dumps(value, default=str) + "\n").encode("utf-8")
+
+
+# the response is closed when done rather than sized up front, so results can be streamed
+async def send_json_lines(writer, status, *values):
+    """Write the response head, and any JSON values given, to the client."""
+    writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/x-ndjson\r\n"
+                 f"Cache-Control: no-store\r\nConnection: close\r\n\r\n".encode("latin-1"))
+    for value in values:
+        writer.write(json_line(value))
+    await writer.drain()
+
+
+def serve(address, preload_model=False):
+    """Run the search service on a host:port or Unix socket path until interrupted."""
+    import asyncio
+
+    service = SearchService(preload_model)
+
+    async def run():
+        if "/" in address:
+            server = await asyncio.start_unix_server(service.handle, path=address)
+        else:
+            host, _, port = address.rpartition(":")
+            server = await asyncio.start_server(service.handle, host or "127.0.0.1", int(port))
+        print(f"Serving searches of {folder_path} on {address} (Ctrl-C to stop)")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("Service stopped.")
+    finally:
+        service.close()
 
 
 # main menu
 def main():
     while True:
-        print("Choose an action:\n1. Transcribe All Videos\n2. Transcribe Remaining Videos\n3. Transcribe Specific Video(s)\n4. Search Transcripts")
+        print("Choose an action:\n1. Transcribe All Videos\n2. Transcribe Remaining Videos\n3. Transcribe Specific Video(s)\n4. Search Transcripts\n5. Choose Whisper Model\n6. Fuzzy Search Transcripts\n7. Batch Search From a Terms File")
         action = input("Your choice: ")
         
         if action == "1":
             print("\nTranscribing all videos...")
-            transcribe_all_videos(folder_path)
+            transcribe_videos_in_folder(folder_path)
         elif action == "2":
             print("\nTranscribing remaining videos (those without existing transcripts)...")
             transcribe_remaining_videos(folder_path)
@@ -486,8 +2576,85 @@ def main():
                     print("No matches found.")
             else:
                 print("No transcripts found. Run the transcription first.")
+        elif action == "5":
+            while True:
+                name = input(f"Model size (tiny, base, small, medium, large) [currently {model_name}]: ").strip()
+                if not name or name in model_names:
+                    break
+                print(f"Unknown model. Choose one of: {', '.join(model_names)}")
+            if name:
+                set_model(name)
+                print(f"Transcriptions will use the '{model_name}' model.")
+        elif action == "6":
+            search_term = input("Enter search term (spelling mistakes and sound-alikes allowed): ")
+            fuzzy_search_in_transcripts(folder_path, search_term)
+        elif action == "7":
+            terms_path = input("Path of the terms file (one query per line): ").strip().strip('"')
+            if os.path.exists(terms_path):
+                batch_search(folder_path, terms_path)
+            else:
+                print("No such file.")
         else:
-            print("Invalid action. Please choose 1, 2, 3, or 4.")
+            print("Invalid action. Please choose 1 to 7.")
+
+
+# command line options; the interactive menu is still the default
+def parse_arguments():
+    """Parse the command line."""
+    parser = argparse.ArgumentParser(description="Transcribe videos with Whisper and search the transcripts.")
+    parser.add_argument("--folder", default=folder_path,
+                        help="folder with the videos (default: %(default)s)")
+    parser.add_argument("--model", default=model_name, choices=model_names, metavar="MODEL",
+                        help="Whisper model size: tiny, base, small, medium or large (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=transcription_workers,
+                        help="videos transcribed at once (default: %(default)s)")
+    parser.add_argument("--threads", type=int,
+                        help="torch threads per transcription worker (default: cores divided by workers)")
+    parser.add_argument("--vad", action="store_true",
+                        help="skip silent stretches of audio before transcribing")
+    parser.add_argument("--batch", metavar="TERMS_FILE",
+                        help="run every query in a terms file against the transcripts, write the results and exit")
+    parser.add_argument("--batch-output", metavar="FOLDER",
+                        help="where --batch writes its results (default: batch_results in the video folder)")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep transcribing and indexing new or changed videos as they arrive in the folder")
+    parser.add_argument("--serve", nargs="?", const=serve_address, metavar="ADDRESS",
+                        help=f"run as a search service on host:port or a Unix socket path (default: {serve_address})")
+    parser.add_argument("--preload-model", action="store_true",
+                        help="with --serve, load the Whisper model at startup and keep it loaded")
+    parser.add_argument("--startup-time", action="store_true",
+                        help="report how long startup takes and exit; fails if it is over budget or loaded torch")
+    return parser.parse_args()
+
+
+# how long it takes to get to the menu, and whether anything heavy was imported on the way
+def report_startup_time():
+    """Print the startup time and return a non-zero exit status if it regressed."""
+    elapsed = time.perf_counter() - startup_started
+    heavy_modules = [name for name in ("whisper", "torch") if name in sys.modules]
+    print(f"Startup took {elapsed * 1000:.1f} ms (budget {startup_budget_seconds * 1000:.0f} ms).")
+    if heavy_modules:
+        print(f"Startup imported {', '.join(heavy_modules)}; these should only load when transcribing.")
+    return 1 if heavy_modules or elapsed > startup_budget_seconds else 0
+
 
 if __name__ == "__main__":
+    arguments = parse_arguments()
+    if arguments.folder != folder_path:
+        set_folder(arguments.folder)
+    set_model(arguments.model)
+    transcription_workers = max(1, arguments.workers)
+    threads_per_worker = max(1, arguments.threads or (os.cpu_count() or 1) // transcription_workers)
+    use_vad = arguments.vad
+    if arguments.startup_time:
+        sys.exit(report_startup_time())
+    if arguments.batch:
+        batch_search(folder_path, arguments.batch, arguments.batch_output)
+        sys.exit(0)
+    if arguments.serve:
+        serve(arguments.serve, arguments.preload_model)
+        sys.exit(0)
+    if arguments.watch:
+        watch_folder(folder_path)
+        sys.exit(0)
     main()